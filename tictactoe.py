@@ -0,0 +1,126 @@
+"""
+Tic-Tac-Toe (command line entry of the games, bot statistics and tools)
+
+    python3 tictactoe.py [play]              play with the bot
+    python3 tictactoe.py 2players            two players on one terminal
+    python3 tictactoe.py stats [options]     win rates of two bots
+    python3 tictactoe.py tables [options]    win rate tables of bot levels
+    python3 tictactoe.py bench [options]     benchmarks, and --startup time
+    python3 tictactoe.py tournament|profile|server [options]
+
+Only the modules of the subcommand are imported, when it runs, so that
+the games start quickly; NumPy, the solver, the learned model and the
+like are loaded by the options using them.
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import sys
+
+
+def play(argv):
+    from tictactoe_with_bot import main_play_with_bot
+    main_play_with_bot()
+
+
+def two_players(argv):
+    from tictactoe_2players import main_2players
+    main_2players()
+
+
+def _stats_parser(description):
+    import argparse
+    parser = argparse.ArgumentParser(prog='tictactoe.py',
+                                     description=description)
+    parser.add_argument('--size', type=int, default=3,
+                        help='grid size n of the board')
+    parser.add_argument('--win-len', type=int,
+                        help='k in a row to win, n if not given')
+    parser.add_argument('--games', type=int, dest='n_games',
+                        help='games (per pair of levels), 10000 if not given')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--batch', action='store_true', default=None,
+                        help='NumPy batch simulator')
+    parser.add_argument('--ci-width', type=float,
+                        help='stop once 95%% intervals are this wide')
+    return parser
+
+
+def _given(args, names):
+    """ Options given on the command line, as keyword arguments, so that
+        the defaults of the function called apply to the others
+    """
+    return {name: getattr(args, name) for name in names
+            if getattr(args, name) is not None}
+
+
+def stats(argv):
+    parser = _stats_parser('Win rates of two bots')
+    parser.add_argument('levels', type=float, nargs='*', default=[0.4, 0.4],
+                        help='smart levels of bot-1 and bot-2')
+    args = parser.parse_args(argv)
+    if len(args.levels) != 2:
+        parser.error('two smart levels expected')
+    from tictactoe_with_bot import main_bot_vs_bot
+    main_bot_vs_bot(args.size, args.levels[0], args.levels[1],
+                    **_given(args, ('n_games', 'workers', 'seed', 'batch',
+                                    'win_len', 'ci_width')))
+
+
+def tables(argv):
+    parser = _stats_parser('Win rate tables of bots at pairs of levels '
+                           '(on all CPUs, to 0.02 wide intervals, by default)')
+    parser.add_argument('--levels', type=float, nargs='+',
+                        default=[i/10 for i in range(11)])
+    args = parser.parse_args(argv)
+    if args.win_len is not None:
+        parser.error('--win-len not supported by tables')
+    from tictactoe_with_bot import main_bot_vs_bot_tables
+    main_bot_vs_bot_tables(args.size, args.levels,
+                           **_given(args, ('n_games', 'workers', 'seed',
+                                           'batch', 'ci_width')))
+
+
+def bench(argv):
+    from tictactoe_bench import main_bench
+    main_bench(argv)
+
+
+def tournament(argv):
+    from tictactoe_tournament import main_tournament
+    main_tournament(argv)
+
+
+def profile(argv):
+    from tictactoe_profile import main_profile
+    main_profile(argv)
+
+
+def server(argv):
+    from tictactoe_server import main_server
+    main_server(argv)
+
+
+COMMANDS = {'play': play, '2players': two_players, 'stats': stats,
+            'tables': tables, 'bench': bench, 'tournament': tournament,
+            'profile': profile, 'server': server}
+
+
+def main(argv=None):
+    """ Run a subcommand, 'play' if none
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    cmd = argv[0] if len(argv) > 0 else 'play'
+    if cmd not in COMMANDS:
+        if cmd not in ('-h', '--help', 'help'):
+            print(f'unknown subcommand: {cmd}')
+        print(__doc__.split('\n\n')[1])
+        return 0 if cmd in ('-h', '--help', 'help') else 2
+    COMMANDS[cmd](argv[1:])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,67 +5,35 @@ MIT license
 Copyright (c) 2024 ddotplus@github
 """
 
-
-def init_game(board_size=3, users_hist=None):
-    """ Initialize tic-tac-toe game
-    Input:
-        board_size: int, grid size n of a play board nxn
-        users_hist: list, users' position history, eg.
-            [[usr1_pos1, usr1_pos2, usr1_pos3], [usr2_pos1, usr2_pos2]]
-            if there is, otherwise use the default.
-    Output:
-        users_hist: list, initialized or checked history
-        win_lines: list of sets, on-a-line positions for winning conditions
-    """
-    board_pos_label = list(range(1, 1 + board_size ** 2))
-    if users_hist is None:
-        users_hist = [[], []]
-    else:
-        ## check consistence
-        if len(users_hist[0]) != len(set(users_hist[0])) \
-           or len(users_hist[1]) != len(set(users_hist[1])):
-            raise ValueError("init_game(): <users_hist> position duplicates")
-        if len(set(sum(users_hist, [])) - set(board_pos_label)) > 0:
-            raise ValueError("init_game(): <users_hist> out of position range")
-        if len(users_hist[0]) < len(users_hist[1]) or \
-           len(users_hist[0]) > len(users_hist[1]) + 1:
-            raise ValueError("init_game(): <users_hist> wrong lengths")
-    ## lines on play board for winning
-    win_lines = []
-    tmp = list(range(board_size))
-    for i in range(board_size):
-        win_lines.append({1 + x + i * board_size for x in tmp})
-        win_lines.append({1 + x * board_size + i for x in tmp})
-    win_lines.append({1 + x * board_size + x for x in tmp})
-    win_lines.append({(1+x) * board_size - x for x in tmp})
-    return users_hist, win_lines
+from tictactoe_engine import BoardState, WinWindows, check_users_hist, \
+    encode_game, init_game, new_game, read_game
+from tictactoe_render import BoardRenderer, board_margin, frame_lines, \
+    show_cells
+from math import isqrt
+from time import perf_counter
+import threading
+import tictactoe_profile
 
 
 def display(board_size, position_list):
     """ Box-drawing of tic-tac-toe play board
     Input:
-        board_size: int, grid size n of a play board nxn, with n < 32,
-              i.e. <= sqrt(999), as each text box only for 3 digits
+        board_size: int, grid size n of a play board nxn, text boxes are
+              widened beyond 3 digits for n >= 32
         position_list: list, a list of position numbers within [1, n**2], or
               position history of two users
     Output:
         boxdraw: list, recorded in a list of line strings
     """
-    if board_size >= 32:
-        raise ValueError("display(): <board_size> >= 32, as 32**2 > 999.")
     if isinstance(position_list[0], list):
-        tmp = sum(list(position_list), [])
+        tmp = position_list[0] + position_list[1]
     else:
         tmp = list(position_list)
     if len(tmp) > 0 and (min(tmp) < 1 or max(tmp) > board_size ** 2):
         raise ValueError("display(): <position_list> out of range: [1,n**2]")
     if isinstance(position_list[0], list):
         ## case of player-1/2 position history
-        show_list = [str(i) for i in list(range(1, 1 + board_size ** 2))]
-        for y in position_list[0]:
-            show_list[y-1] = 'X'
-        for y in position_list[1]:
-            show_list[y-1] = 'O'
+        show_list = show_cells(board_size, position_list)
     else:
         ## case of single position list
         if len(position_list) == board_size**2:  ## ready to show
@@ -74,37 +42,69 @@ def display(board_size, position_list):
             show_list = [' '] * board_size ** 2
             for y in position_list:
                 show_list[y-1] = str(y)
-    boxdraw = ["┌───" + "┬───" * (board_size - 1) + "┐"]
-    for i in range(board_size):
-        row = [f'{s: ^3}' for s in show_list[i*board_size:(i+1)*board_size]]
-        for j in range(board_size, -1, -1):
-            row.insert(j, '│')
-        boxdraw.append(''.join(row))
-        boxdraw.append("├───" + "┼───" * (board_size - 1) + "┤")
-    boxdraw[-1] = "└───" + "┴───" * (board_size - 1) + "┘"
-    hspace = max([1, 8-board_size//4-board_size//6])
-    for line in boxdraw:
-        print(' ' * hspace + line.replace('X', '\033[31mX\033[0;0m')
-              .replace('O', '\033[34mO\033[0;0m'))  # with font colors
+    boxdraw = frame_lines(board_size, show_list)
+    hspace = board_margin(board_size)
+    print('\n'.join(' ' * hspace + line for line in
+                    frame_lines(board_size, show_list, color=True)))
     return boxdraw
 
 
 def update_winlines(win_lines, users_hist):
     """ remove useless sets in <win_lines>,
         to reduce unnecessary searching space of winning conditions
+        (a WinWindows is left as it is: the live windows are returned as
+        a new list of sets)
     """
+    if isinstance(win_lines, WinWindows):
+        win_lines = win_lines.sets()
+    prof = tictactoe_profile.active
+    if prof is not None:
+        t0 = perf_counter()
+        n_lines = len(win_lines)
+    hist_0 = set(users_hist[0])
+    hist_1 = set(users_hist[1])
     for i in range(len(win_lines)-1, -1, -1):
-        if len(win_lines[i].intersection(set(users_hist[0]))) > 0 and \
-           len(win_lines[i].intersection(set(users_hist[1]))) > 0:
+        if not win_lines[i].isdisjoint(hist_0) and \
+           not win_lines[i].isdisjoint(hist_1):
             win_lines.pop(i)
+    if prof is not None:
+        prof.add_time('prune', perf_counter() - t0)
+        prof.count('lines_pruned', n_lines - len(win_lines))
     return win_lines
 
 
-def check_win_status(win_lines, users_hist):
+def _lines_board_size(win_lines, users_hist):
+    """ Least grid size n of a board holding <win_lines> and <users_hist>:
+        the last position taken or on a line, and the step of a vertical
+        or diagonal line (n-1, n or n+1), both only reach up to n
+    """
+    last = max(max(map(max, win_lines)),
+               max((max(h) for h in users_hist if len(h) > 0), default=1))
+    n = isqrt(last - 1) + 1
+    for w in win_lines:
+        if len(w) > 1:
+            p, q = sorted(w)[:2]
+            n = max(n, q - p - 1)
+    return n
+
+
+_win_tracker = threading.local()   ## .game: [win_lines, BoardState] checked
+                                   ## last in this thread
+
+
+@tictactoe_profile.timed('win_check')
+def check_win_status(win_lines, users_hist, board_size=None):
     """ Check if any player wins
+        (incremental: only the positions added to <users_hist> since the
+        last call on the same <win_lines> are counted into the lines)
     Input:
-        win_lines: list of sets, collection of winning conditions
+        win_lines: list of sets, collection of winning conditions, or
+            WinWindows (not pruned, being read only)
         users_hist: list, users' position history
+        board_size: int, grid size n of a play board nxn, found from the
+            positions of <win_lines> and <users_hist> if None (pass it for
+            a list of k-in-a-row lines pruned late in a game, whose
+            positions may no longer reach the last row)
     Output:
         win: int, status of win status
              0: game continues
@@ -112,25 +112,71 @@ def check_win_status(win_lines, users_hist):
              2: game stops, player-2 wins
              -1: game stops, no one wins
     """
-    win = 0
-    for w in win_lines:
-        if len(w - set(users_hist[0])) == 0:
-            win = 1
-            print('Player1 (X) won the game, congratulations!')
-        if len(w - set(users_hist[1])) == 0:
-            win = 2
-            print('Player2 (O) won the game, congratulations!')
-    win_lines = update_winlines(win_lines, users_hist)
     if len(win_lines) == 0:
-        win = -1
-        print('No one can win the game any more!\nThe game is over.')
+        show_win_status(-1)
+        return -1
+    new_pos = None
+    game = getattr(_win_tracker, 'game', None)
+    if game is not None and game[0] is win_lines:
+        board = game[1]
+        new_pos = board.sync(users_hist)
+    if new_pos is None:
+        if isinstance(win_lines, WinWindows):
+            board_size = win_lines.board_size
+        elif board_size is None:
+            board_size = _lines_board_size(win_lines, users_hist)
+        board = BoardState(board_size, win_lines)
+        new_pos = board.sync(users_hist)
+        if new_pos is None:
+            raise ValueError('check_win_status(): <users_hist> wrong lengths')
+        _win_tracker.game = [win_lines, board]
+    win = board.status
+    show_win_status(win)
+    if isinstance(win_lines, WinWindows):
+        return win
+    ## remove the lines just blocked by both players
+    dead = {id(board.line_sets[i]) for p in new_pos
+            for i in board.cell_lines[p] if not board.is_live(i)}
+    if len(dead) > 0:
+        win_lines[:] = [w for w in win_lines if id(w) not in dead]
+        if tictactoe_profile.active is not None:
+            tictactoe_profile.active.count('lines_pruned', len(dead))
     return win
 
 
-def hist_input(board_size):
+def show_win_status(win):
+    """ Print the message for a final win status of check_win_status()
+    """
+    if win == 1:
+        print('Player1 (X) won the game, congratulations!')
+    elif win == 2:
+        print('Player2 (O) won the game, congratulations!')
+    elif win == -1:
+        print('No one can win the game any more!\nThe game is over.')
+
+
+def win_len_input(board_size):
+    """ Get an input of how many positions in a row win the game
+    Input:
+        board_size: int, grid size n of a play board nxn
+    Output:
+        win_len: int, k positions in a row to win, within [3, n]
+    """
+    if board_size <= 3:
+        return board_size
+    p = input(f'How many in a row to win the game? [{board_size}]: ')
+    while len(p) > 0 and (not p.isdecimal() or int(p) < 3
+                          or int(p) > board_size):
+        p = input(f'  > not an integer in [3,{board_size}]. '
+                  + f'try again [{board_size}]: ')
+    return int(p) if len(p) > 0 else board_size
+
+
+def hist_input(board_size, win_len=None):
     """ Get an input of users' previous game history if user wants
     Input:
         board_size: int, grid size n of a play board nxn
+        win_len: int, k positions in a row to win, n if None
     Output:
         users_hist: list, checked input from user
     """
@@ -138,54 +184,53 @@ def hist_input(board_size):
     inp = input('Do you want continue an unfinished game? (y/n) [n]: ')
     if inp.lower() == 'y' or inp.lower() == 'yes':
         print("   %% 'n' - just pass, start a new game")
-        print('  > please input history of two users in list form below:')
+        print('  > please input the moves in playing order, eg. 5,1,9')
+        print('    or history of two users in list form below:')
         print('    [[usr1_pos1, usr1_pos2, ...], [usr2_pos1, ...]]')
         inp = input('    ')
-        chk_input = True
-        while chk_input:
+        while True:
             if inp.lower() == 'n':
                 print('Start a new game now ...')
+                users_hist = None
                 break
-            try:
-                ## exec() cannot modify local var directly, work around
-                ldict = {}
-                exec('a = ' + inp, globals(), ldict)
-                users_hist = ldict['a']
-            except SyntaxError:
-                print('  > not valid expression, try again:')
-                inp = input('    ')
-                continue
-            if not isinstance(users_hist, list):
-                print('  > not a list, try again:')
-                inp = input('    ')
-            elif len(users_hist) != 2 or \
-                    not isinstance(users_hist[0], list) or \
-                    not isinstance(users_hist[1], list):
-                print('  > not a list of two lists, try again:')
-                inp = input('    ')
-            elif len(set(sum(users_hist[0:2], []))
-                     - set(range(1, board_size ** 2 + 1))) > 0:
-                print(f'  > not int or out of [1,{board_size ** 2}], '
-                      + 'try again:')
-                inp = input('    ')
-            elif len(sum(users_hist, [])) > len(set(sum(users_hist, []))):
-                print(f'  > duplicate position numbers, try again')
-                inp = input('    ')
-            elif len(users_hist[0]) != len(users_hist[1]) \
-                    and len(users_hist) != 1+len(users_hist[1]):
-                print(f'  > improper lengths from two users, try again')
-                inp = input('    ')
+            if inp.lstrip().startswith('['):
+                import ast
+                try:
+                    users_hist = ast.literal_eval(inp)
+                except (SyntaxError, ValueError, TypeError, RecursionError,
+                        MemoryError):
+                    print('  > not valid list, try again:')
+                    inp = input('    ')
+                    continue
+                error = check_users_hist(board_size, users_hist)
+                if error is None:
+                    users_hist = [list(h) for h in users_hist]
             else:
-                chk_input = False
+                if ':' not in inp:
+                    inp = f'{board_size}/{win_len or board_size}:{inp}'
+                game, error = read_game(inp)
+                if error is None:
+                    n, users_hist, k = game
+                    if n != board_size:
+                        error = 'other board size'
+                    elif (k or n) != (win_len or board_size):
+                        error = 'other winning length'
+            if error is None:
+                break
+            print(f'  > {error}, try again:')
+            inp = input('    ')
     return users_hist
 
 
-def get_input(board_size, users_hist, available_pos):
+def get_input(board_size, users_hist, available_pos, renderer=None,
+              win_len=None):
     """ Get an input of a proper position chosen by user
     Input:
         board_size: int, grid size n of a play board nxn
         users_hist: list, users' position history
         available_pos: list, available positions on play board
+        renderer: BoardRenderer, to draw the board on 'd', if any
+        win_len: int, k positions in a row to win, n if None
     Output:
         inp: user chosen position
     """
@@ -194,13 +239,16 @@ def get_input(board_size, users_hist, available_pos):
     print("   %% 'u' - print users' history")
     print("   %% 'q' - quit")
     inp = input(f'  > please input position [1-{board_size ** 2}]: ')
-    while not inp.isdigit() or (int(inp) not in available_pos):
+    while not inp.isdecimal() or (int(inp) not in available_pos):
         if inp == 'a':
             print(f'  available positions:')
-            print(f'    {available_pos}')
+            print(f'    {sorted(available_pos)}')
             inp = input('  > input your position choice: ')
         elif inp == 'd':
-            display(board_size, users_hist)
+            if renderer is None:
+                display(board_size, users_hist)
+            else:
+                renderer.draw(users_hist)
             inp = input(f'  > input position [1-{board_size ** 2}]: ')
         elif inp == 'u':
             print("  players' history:")
@@ -209,6 +257,7 @@ def get_input(board_size, users_hist, available_pos):
         elif inp == 'q':
             print("Users' history (in case to continue later):")
             print(f'    {users_hist}')
+            print(f'    or {encode_game(board_size, users_hist, win_len)}')
             print('Quit game now.')
             exit(0)
         else:
@@ -226,33 +275,35 @@ def main_2players():
     ## initialize a game
     board_size_n = 3                   ## by default
     p = input('Please input grid size of the play board [3]: ')
-    while len(p) > 0 and (not p.isdigit() or int(p) < 3):
+    while len(p) > 0 and (not p.isdecimal() or int(p) < 3):
         p = input('  > not an integer or too small (<3). try again [3]: ')
     if len(p) > 0:
         board_size_n = int(p)
-    users_history = hist_input(board_size_n)
-    users_record, win_line = init_game(board_size_n, users_history)
+    win_len = win_len_input(board_size_n)
+    users_history = hist_input(board_size_n, win_len)
+    board = new_game(board_size_n, users_history, win_len)
+    users_record = board.users_hist
 
-    display(board_size_n, users_record)
-    available_pos_label = list(set(range(1, board_size_n ** 2 + 1))
-                               - set(users_record[0])
-                               - set(users_record[1]))
-    win_status = 0
+    prof = tictactoe_profile.active
+    if prof is not None:
+        prof.board_size = board_size_n
+    renderer = BoardRenderer(board_size_n)
+    renderer.draw(users_record)
+    win_status = board.status
     while win_status == 0:
         if len(users_record[0]) == len(users_record[1]):
             print('Player1 (X):')
-            p = get_input(board_size_n, users_record, available_pos_label)
-            users_record[0].append(p)
-        elif len(users_record[0]) == 1 + len(users_record[1]):
+        else:
             print('Player2 (O):')
-            p = get_input(board_size_n, users_record, available_pos_label)
-            users_record[1].append(p)
+        p = get_input(board_size_n, users_record, board.available_pos,
+                      renderer, win_len)
+        if prof is None:
+            win_status = board.make(p)
         else:
-            raise ValueError('main(): <users_record> lengths go wrong :()')
-        available_pos_label.remove(p)
-        display(board_size_n, users_record)
-        win_status = check_win_status(win_line, users_record)
-    display(board_size_n, users_record)
+            win_status = prof.make(board, p)
+        renderer.update(users_record)
+    show_win_status(win_status)
+    renderer.close()
     print('')
 
 
@@ -0,0 +1,167 @@
+"""
+Tic-Tac-Toe Batch Simulator (bot against bot games in lockstep, with NumPy)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import numpy as np
+
+from tictactoe_engine import init_game
+
+
+def incidence_matrix(board_size, win_len=None):
+    """ Incidence of winning lines and positions
+    Input:
+        board_size: int, grid size n of a play board nxn
+        win_len: int, k positions in a row to win, n if None
+    Output:
+        inc: numpy array (lines x n**2) of float32, 1 if the position
+             (column j for position j+1) is on the line, otherwise 0
+    """
+    win_lines = init_game(board_size, None, win_len)[1]
+    inc = np.zeros((len(win_lines), board_size ** 2), dtype=np.float32)
+    for i, w in enumerate(win_lines):
+        inc[i, [p - 1 for p in w]] = 1
+    return inc
+
+
+def line_counts(boards, inc, board_size):
+    """ Num of positions of both players on every line, by one matmul
+    Input:
+        boards: numpy array (B x n**2) of int8, 0: empty, 1: X, 2: O
+        inc: numpy array, incidence_matrix() of the board size
+        board_size: int, grid size n of a play board nxn
+    Output:
+        counts_x, counts_o: numpy arrays (B x lines) of int32
+    """
+    ## X counts 1 and O counts n+1, so that both are decoded from one sum
+    weight = np.array([0, 1, board_size + 1], dtype=np.float32)
+    sums = (weight[boards] @ inc.T).astype(np.int32)
+    return sums % (board_size + 1), sums // (board_size + 1)
+
+
+def _pick(cand, rng):
+    """ Pick one True column per row uniformly at random
+    """
+    noise = rng.random(cand.shape)
+    return np.argmax(np.where(cand, noise, -1.0), axis=1)
+
+
+def batch_bot_moves(boards, counts, player, bot_level, inc, rng):
+    """ Positions chosen by bots for a batch of games, applying the rules
+        of get_input_from_bot() to all games in lockstep
+    Input:
+        boards: numpy array (B x n**2) of int8, games with <player> to move
+        counts: tuple, line_counts() of <boards>
+        player: int, 0 for player-1 (X), 1 for player-2 (O)
+        bot_level: float, smart level of the bots
+        inc: numpy array, incidence_matrix() of the board size
+        rng: numpy.random.Generator, random generator
+    Output:
+        pos: numpy array (B,) of int, chosen column (position - 1) per game
+    """
+    n_games = boards.shape[0]
+    win_len = int(inc[0].sum())
+    empty = boards == 0
+    pos = np.zeros(n_games, dtype=np.int64)
+    undecided = np.ones(n_games, dtype=bool)
+    bot_prob = bot_level ** 1.5 + 1e-6
+    mine, other = counts[player], counts[1 - player]
+    for i in range(1, win_len):
+        for own, opp in ((mine, other), (other, mine)):
+            draw = rng.random(n_games) < bot_prob
+            rows = np.nonzero(undecided & draw)[0]
+            if len(rows) == 0:
+                continue
+            ## lines missing exactly i positions, all still empty
+            lines_i = ((own[rows] == win_len - i)
+                       & (opp[rows] == 0)).astype(np.float32)
+            score = np.where(empty[rows], lines_i @ inc, 0)
+            score_max = score.max(axis=1)
+            found = score_max > 0
+            cand = score[found] == score_max[found][:, None]
+            rows = rows[found]
+            pos[rows] = _pick(cand, rng)
+            undecided[rows] = False
+    rows = np.nonzero(undecided)[0]
+    pos[rows] = _pick(empty[rows], rng)
+    return pos
+
+
+def batch_play(board_size, bot1_level, bot2_level, n_games, rng,
+               win_len=None):
+    """ Play a batch of bot against bot games until all stop
+    Output:
+        win: numpy array (n_games,) of int8, final win status of each game
+             as check_win_status(): 1, 2 or -1
+        moves: numpy array (n_games x n**2) of uint16, positions of each
+             game in playing order, padded with 0
+    """
+    inc = incidence_matrix(board_size, win_len)
+    win_len = int(inc[0].sum())
+    boards = np.zeros((n_games, board_size ** 2), dtype=np.int8)
+    moves = np.zeros((n_games, board_size ** 2), dtype=np.uint16)
+    win = np.zeros(n_games, dtype=np.int8)
+    active = np.arange(n_games)
+    levels = (bot1_level, bot2_level)
+    counts = line_counts(boards, inc, board_size)
+    for ply in range(board_size ** 2):
+        player = ply & 1
+        pos = batch_bot_moves(boards[active], counts, player, levels[player],
+                              inc, rng)
+        boards[active, pos] = player + 1
+        moves[active, ply] = pos + 1
+        counts = line_counts(boards[active], inc, board_size)
+        won = (counts[player] == win_len).any(axis=1)
+        dead = ((counts[0] > 0) & (counts[1] > 0)).all(axis=1)
+        win[active[won]] = player + 1
+        win[active[dead & ~won]] = -1
+        going = ~(won | dead)
+        active = active[going]
+        counts = (counts[0][going], counts[1][going])
+        if len(active) == 0:
+            break
+    return win, moves
+
+
+def batch_bot_vs_bot_counts(board_size, bot1_level, bot2_level,
+                            n_games=10000, seed=None, batch_size=8192,
+                            win_len=None, record=None):
+    """ Play bot against bot games as bot_vs_bot_counts(), but simulated
+        in batches of games with NumPy
+    Input:
+        board_size: int, grid size n of a play board nxn
+        bot1_level: float, smart level for bot-1, range: [0,1]
+        bot2_level: float, smart level for bot-2, range: [0,1]
+        n_games: int, number of games to test for statistics
+        seed: int, seed for reproducible statistics, or None
+        batch_size: int, max number of games played in lockstep
+        win_len: int, k positions in a row to win, n if None
+        record: str, file to append the played games to, if given
+    Output:
+        counts: list, numbers of bot-1 wins, bot-2 wins and draws
+    """
+    rng = np.random.default_rng(seed)
+    counts = [0, 0, 0]
+    n_games = int(n_games)
+    writer = None
+    if record is not None:
+        from tictactoe_records import GameRecordWriter
+        writer = GameRecordWriter(record)
+    for start in range(0, n_games, batch_size):
+        win, moves = batch_play(board_size, bot1_level, bot2_level,
+                                min(batch_size, n_games - start), rng,
+                                win_len)
+        if writer is not None:
+            n_moves = (moves > 0).sum(axis=1)
+            for i in range(len(win)):
+                writer.write(board_size, win_len or board_size,
+                             (bot1_level, bot2_level), seed or 0,
+                             moves[i, :n_moves[i]], int(win[i]))
+        counts[0] += int((win == 1).sum())
+        counts[1] += int((win == 2).sum())
+        counts[2] += int((win == -1).sum())
+    if writer is not None:
+        writer.close()
+    return counts
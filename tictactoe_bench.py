@@ -0,0 +1,241 @@
+"""
+Tic-Tac-Toe Benchmarks (game engine and bot hot paths)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from tictactoe_engine import BoardState, init_game, play_game
+from tictactoe_2players import check_win_status, update_winlines
+from tictactoe_with_bot import bot_player, find_win_pos_best, \
+    get_input_from_bot
+
+
+def _mean_us(times):
+    return round(1e6 * sum(times) / len(times), 3) if len(times) > 0 else None
+
+
+def bench_board(board_size, bot_level, n_games=100, seed=0, n_replay=20):
+    """ Benchmark bot against bot games at one board size and smart level
+    Input:
+        board_size: int, grid size n of a play board nxn
+        bot_level: float, smart level of both bots
+        n_games: int, number of games to time
+        seed: int, seed of the random generator
+        n_replay: int, number of those games replayed to time single calls
+    Output:
+        result: dict, games/sec, moves/sec, mean latency of the calls in
+            microseconds and peak memory of the games in KiB
+    """
+    rng = random.Random(seed)
+    bots = [bot_player(bot_level, rng), bot_player(bot_level, rng)]
+    board = BoardState(board_size, init_game(board_size)[1])
+    games = []
+    n_moves = 0
+    t0 = time.perf_counter()
+    for i in range(n_games):
+        play_game(board.reset(), bots)
+        games.append(list(board.moves))
+        n_moves += len(board.moves)
+    elapsed = time.perf_counter() - t0
+
+    ## latency of single calls, replaying some of the games
+    timer = time.perf_counter
+    calls = {'init_game': [], 'check_win_status': [], 'update_winlines': [],
+             'find_win_pos_best': [], 'get_input_from_bot': []}
+    for i in range(max(1, n_replay // 10)):
+        t = timer()
+        init_game(board_size)
+        calls['init_game'].append(timer() - t)
+    for moves in games[:n_replay]:
+        board.reset()
+        users_hist = [[], []]
+        win_lines = init_game(board_size)[1]
+        for pos in moves:
+            player = len(board.moves) & 1
+            live = board.live_lines()
+            for N in range(1, board_size):
+                t = timer()
+                find_win_pos_best(users_hist[player], board.available_pos,
+                                  live, N)
+                calls['find_win_pos_best'].append(timer() - t)
+            ## as bot_player() calls it, with its arguments
+            t = timer()
+            get_input_from_bot(board.users_hist, board.available_pos,
+                               board.line_sets, board.board_size, bot_level,
+                               rng, board=board)
+            calls['get_input_from_bot'].append(timer() - t)
+            board.make(pos)
+            users_hist[player].append(pos)
+            lines = list(live)
+            t = timer()
+            update_winlines(lines, users_hist)
+            calls['update_winlines'].append(timer() - t)
+            with contextlib.redirect_stdout(io.StringIO()):
+                t = timer()
+                check_win_status(win_lines, users_hist)
+                calls['check_win_status'].append(timer() - t)
+
+    ## peak memory of the games, in a separate run as tracing slows it down
+    rng.seed(seed)
+    tracemalloc.start()
+    for i in range(min(n_games, n_replay)):
+        play_game(board.reset(), bots)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'board_size': board_size,
+            'bot_level': bot_level,
+            'n_games': n_games,
+            'games_per_sec': round(n_games / elapsed, 3),
+            'moves_per_sec': round(n_moves / elapsed, 3),
+            'latency_us': {k: _mean_us(v) for k, v in calls.items()},
+            'peak_memory_kib': round(peak / 1024, 1)}
+
+
+def run_benchmarks(sizes=range(3, 16), levels=(0.0, 0.5, 1.0), n_games=100,
+                   seed=0, verbose=True):
+    """ Benchmark all pairs of board sizes and smart levels
+    Input:
+        sizes: list, grid sizes of play boards
+        levels: list, smart levels of bots
+        n_games: int, number of games for each pair
+        seed: int, seed of the random generators
+        verbose: bool, print a line for each pair when done
+    Output:
+        report: dict, environment and bench_board() results, JSON ready
+    """
+    report = {'python': platform.python_version(),
+              'platform': platform.platform(),
+              'seed': seed,
+              'results': []}
+    for n in sizes:
+        for level in levels:
+            result = bench_board(n, level, n_games, seed)
+            report['results'].append(result)
+            if verbose:
+                print('{:>2}x{:<2} level {:.2f}: {:>9.1f} games/s, '
+                      '{:>10.1f} moves/s, bot {:>8.1f} us/move, '
+                      '{:>8.1f} KiB'.format(
+                          n, n, level, result['games_per_sec'],
+                          result['moves_per_sec'],
+                          result['latency_us']['get_input_from_bot'],
+                          result['peak_memory_kib']))
+    return report
+
+
+def _first_prompt_secs(cmd):
+    """ Seconds from starting command <cmd> to its first input prompt
+    """
+    import subprocess
+    t0 = time.perf_counter()
+    p = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL)
+    out = b''
+    ## a prompt of input() is flushed without a newline
+    while len(out) == 0 or out.endswith(b'\n'):
+        data = os.read(p.stdout.fileno(), 4096)
+        if len(data) == 0:
+            break
+        out += data
+    secs = time.perf_counter() - t0
+    p.kill()
+    p.communicate()
+    return secs
+
+
+def startup_times(commands=('play', '2players'), runs=5):
+    """ Time from launching the command line entry tictactoe.py to the
+        first prompt of the game, median of some runs
+    Input:
+        commands: list, subcommands of tictactoe.py
+        runs: int, num of runs of each
+    Output:
+        times: dict, subcommand -> milliseconds, and 'python' for the
+            interpreter alone, printing a prompt
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'tictactoe.py')
+    cmds = {'python': [sys.executable, '-c', "input('>')"]}
+    for c in commands:
+        cmds[c] = [sys.executable, script, c]
+    times = {}
+    for name, cmd in cmds.items():
+        secs = sorted(_first_prompt_secs(cmd) for _ in range(runs))
+        times[name] = round(1e3 * secs[runs // 2], 1)
+    return times
+
+
+def compare_reports(old, new):
+    """ Print speed ratios new/old of two reports of run_benchmarks()
+        (> 1 means faster, for the latency of calls too)
+    """
+    old_results = {(r['board_size'], r['bot_level']): r
+                   for r in old['results']}
+    for r in new['results']:
+        o = old_results.get((r['board_size'], r['bot_level']))
+        if o is None:
+            continue
+        ratios = ['games/s x{:.2f}'.format(r['games_per_sec']
+                                           / o['games_per_sec'])]
+        for k, v in r['latency_us'].items():
+            if v and o['latency_us'].get(k):
+                ratios.append('{} x{:.2f}'.format(k, o['latency_us'][k] / v))
+        print('{:>2}x{:<2} level {:.2f}: '.format(
+            r['board_size'], r['board_size'], r['bot_level'])
+            + ', '.join(ratios))
+
+
+def main_bench(argv=None):
+    """ Command line entry of the benchmarks
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of tic-tac-toe game engine and bots')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(range(3, 16)), help='board sizes')
+    parser.add_argument('--levels', type=float, nargs='+',
+                        default=[0.0, 0.5, 1.0], help='bot smart levels')
+    parser.add_argument('--games', type=int, default=100,
+                        help='games per board size and level')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE',
+                        help="write the report as JSON ('-' for stdout)")
+    parser.add_argument('--compare', metavar='FILE',
+                        help='JSON report of an earlier run to compare with')
+    parser.add_argument('--startup', action='store_true',
+                        help='only time the games to their first prompt')
+    args = parser.parse_args(argv)
+    if args.startup:
+        times = startup_times()
+        base = times.pop('python')
+        for name, ms in times.items():
+            print(f'{name:>9}: {ms:6.1f} ms to first prompt '
+                  f'({ms - base:+.1f} ms over python alone, {base:.1f} ms)')
+        return times
+    report = run_benchmarks(args.sizes, args.levels, args.games, args.seed,
+                            verbose=args.json != '-')
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=1)
+        print('')
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+    return report
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,170 @@
+"""
+Tic-Tac-Toe Opening Book (precomputed best moves of small boards, stored in
+a binary hash table file and read by memory mapping)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import mmap
+import os
+import struct
+
+from tictactoe_engine import BoardState, init_game, symmetry_tables
+
+MAGIC = b'TTTB'
+HEADER = struct.Struct('<4sBBHII')   ## magic, version, board_size, plies,
+                                     ## capacity, count
+RECORD = struct.Struct('<IBb')       ## key + 1 (0: empty slot), move, value
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'books')
+
+
+def book_path(board_size):
+    """ Default file of the opening book for a board size
+    """
+    return os.path.join(BOOK_DIR, f'book_{board_size}x{board_size}.bin')
+
+
+class PositionKey:
+    """ Canonical key of positions under the 8 board symmetries: the least
+        base-3 code (0: empty, 1: X, 2: O for each position) over them
+    Input:
+        board_size: int, grid size n of a play board nxn, up to 4
+    """
+
+    def __init__(self, board_size):
+        if board_size > 4:
+            raise ValueError('PositionKey(): <board_size> > 4, as 3**25 '
+                             + 'does not fit in 32 bits')
+        self.syms, self.inv_syms = symmetry_tables(board_size)[:2]
+        self.weights = [[3 ** (v - 1) if v > 0 else 0 for v in perm]
+                        for perm in self.syms]
+
+    def canonical(self, users_hist):
+        """ Canonical key of a position, and a symmetry giving it
+        Output:
+            key: int, least code over the symmetries
+            sym: int, index of that symmetry in board_symmetries()
+        """
+        codes = []
+        for w in self.weights:
+            codes.append(sum(w[p] for p in users_hist[0])
+                         + 2 * sum(w[p] for p in users_hist[1]))
+        key = min(codes)
+        return key, codes.index(key)
+
+
+def _slot(key, capacity):
+    return (key * 2654435761) & (capacity - 1)
+
+
+def generate_book(board_size, plies=None, path=None):
+    """ Solve all positions up to <plies> moves and write the book file
+    Input:
+        board_size: int, grid size n of a play board nxn, up to 4
+        plies: int, max num of moves played in the stored positions,
+               None for all positions
+        path: str, output file, book_path() by default
+    Output:
+        count: int, number of positions stored
+    """
+    from tictactoe_solver import Solver
+
+    if plies is None:
+        plies = board_size ** 2
+    if path is None:
+        path = book_path(board_size)
+    keys = PositionKey(board_size)
+    solver = Solver(board_size)
+    board = BoardState(board_size, init_game(board_size)[1])
+    entries = {}
+
+    def visit():
+        key, sym = keys.canonical(board.users_hist)
+        if key in entries:
+            return
+        pos, value, depth = solver.best_move(board.users_hist)
+        entries[key] = (keys.syms[sym][pos], (value > 0) - (value < 0))
+        if len(board.moves) >= plies:
+            return
+        for p in sorted(board.available_pos):
+            if board.make(p) == 0:
+                visit()
+            board.unmake()
+
+    visit()
+    capacity = 1
+    while capacity < 2 * len(entries):
+        capacity *= 2
+    table = bytearray(HEADER.size + capacity * RECORD.size)
+    HEADER.pack_into(table, 0, MAGIC, 1, board_size, plies, capacity,
+                     len(entries))
+    for key, (pos, value) in entries.items():
+        i = _slot(key, capacity)
+        while RECORD.unpack_from(table, HEADER.size + i * RECORD.size)[0]:
+            i = (i + 1) & (capacity - 1)
+        RECORD.pack_into(table, HEADER.size + i * RECORD.size,
+                         key + 1, pos, value)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(table)
+    return len(entries)
+
+
+class OpeningBook:
+    """ Memory-mapped opening book written by generate_book()
+    Input:
+        path: str, book file
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.board_size, self.plies, self.capacity, \
+            self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != 1:
+            raise ValueError(f'OpeningBook(): <path> {path} not a book file')
+        self.keys = PositionKey(self.board_size)
+
+    def lookup(self, users_hist):
+        """ Best move of a position, if it is in the book
+        Input:
+            users_hist: list, users' position history
+        Output:
+            (pos, value): best position and the game value for the player
+                in turn (1: win, 0: draw, -1: loss), or None if not found
+        """
+        key, sym = self.keys.canonical(users_hist)
+        i = _slot(key, self.capacity)
+        while True:
+            k, pos, value = RECORD.unpack_from(
+                self.data, HEADER.size + i * RECORD.size)
+            if k == 0:
+                return None
+            if k == key + 1:
+                return self.keys.inv_syms[sym][pos], value
+            i = (i + 1) & (self.capacity - 1)
+
+
+_books = {}   ## board size -> OpeningBook or None, loaded at first use
+
+
+def get_book(board_size):
+    """ Opening book of a board size, loaded when first asked for
+    Output:
+        book: OpeningBook, or None if there is no book file
+    """
+    if board_size not in _books:
+        path = book_path(board_size)
+        _books[board_size] = OpeningBook(path) if os.path.exists(path) \
+            else None
+    return _books[board_size]
+
+
+if __name__ == '__main__':
+    import sys
+    ## e.g. `python3 tictactoe_book.py 4 6` for 4x4 positions up to 6 moves
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    n = generate_book(size, depth)
+    print(f'{n} positions written to {book_path(size)}')
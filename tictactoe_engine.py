@@ -0,0 +1,462 @@
+"""
+Tic-Tac-Toe Game Engine (game state, moves and results, without any I/O)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import random
+from array import array
+from collections import Counter
+
+
+def init_game(board_size=3, users_hist=None, win_len=None):
+    """ Initialize tic-tac-toe game
+    Input:
+        board_size: int, grid size n of a play board nxn
+        users_hist: list, users' position history, eg.
+            [[usr1_pos1, usr1_pos2, usr1_pos3], [usr2_pos1, usr2_pos2]]
+            if there is, otherwise use the default.
+        win_len: int, k positions in a row to win (Gomoku-style), n if None
+    Output:
+        users_hist: list, initialized or checked history
+        win_lines: list of sets, on-a-line positions for winning conditions,
+            or WinWindows of all k-in-a-row windows if k < n (its sets()
+            is the list of sets)
+    """
+    if users_hist is None:
+        users_hist = [[], []]
+    else:
+        ## check consistence
+        error = check_users_hist(board_size, users_hist)
+        if error is not None:
+            raise ValueError(f'init_game(): <users_hist> {error}')
+    if win_len is not None and win_len != board_size:
+        if win_len < 1 or win_len > board_size:
+            raise ValueError("init_game(): <win_len> not in [1,board_size]")
+        return users_hist, WinWindows(board_size, win_len)
+    ## lines on play board for winning
+    win_lines = []
+    tmp = list(range(board_size))
+    for i in range(board_size):
+        win_lines.append({1 + x + i * board_size for x in tmp})
+        win_lines.append({1 + x * board_size + i for x in tmp})
+    win_lines.append({1 + x * board_size + x for x in tmp})
+    win_lines.append({(1+x) * board_size - x for x in tmp})
+    return users_hist, win_lines
+
+
+def check_users_hist(board_size, users_hist):
+    """ Check users' position history in one pass over the positions
+    Input:
+        board_size: int, grid size n of a play board nxn
+        users_hist: list, users' position history
+    Output:
+        error: str, what is wrong with <users_hist>, or None if nothing
+    """
+    if not isinstance(users_hist, (list, tuple)) or len(users_hist) != 2 \
+       or not all(isinstance(h, (list, tuple)) for h in users_hist):
+        return 'not a list of two lists'
+    n_pos = board_size ** 2
+    taken = set()
+    for user_hist in users_hist:
+        for p in user_hist:
+            if not isinstance(p, int) or isinstance(p, bool) \
+               or p < 1 or p > n_pos:
+                return 'out of position range'
+            if p in taken:
+                return 'position duplicates'
+            taken.add(p)
+    if not 0 <= len(users_hist[0]) - len(users_hist[1]) <= 1:
+        return 'wrong lengths'
+    return None
+
+
+def encode_game(board_size, users_hist, win_len=None):
+    """ Game state as a move string: 'n:m1,m2,...', or 'n/k:m1,m2,...' if
+        k in a row wins, with the positions in playing order, eg. '3:5,1,9'
+    Input:
+        board_size: int, grid size n of a play board nxn
+        users_hist: list, users' position history
+        win_len: int, k positions in a row to win, n if None
+    Output:
+        text: str, move string of the game
+    """
+    moves = []
+    for i in range(len(users_hist[0])):
+        moves.append(users_hist[0][i])
+        if i < len(users_hist[1]):
+            moves.append(users_hist[1][i])
+    head = str(board_size)
+    if win_len is not None and win_len != board_size:
+        head += f'/{win_len}'
+    return head + ':' + ','.join(map(str, moves))
+
+
+def read_game(text):
+    """ Game state of a move string of encode_game(), checked, with what
+        is wrong with it instead of an exception
+    Input:
+        text: str, move string 'n:m1,m2,...' or 'n/k:m1,m2,...'
+    Output:
+        game: tuple, (board_size, users_hist, win_len) as decode_game(),
+              None if <text> is wrong
+        error: str, what is wrong with <text>, or None if nothing
+    """
+    head, sep, body = text.strip().partition(':')
+    size_text, _, len_text = head.partition('/')
+    if not sep or not size_text.isdecimal() \
+       or not (len_text == '' or len_text.isdecimal()):
+        return None, 'not as n[/k]:moves'
+    board_size = int(size_text)
+    win_len = int(len_text) if len_text else None
+    if win_len is not None and not 1 <= win_len <= board_size:
+        return None, 'k not in [1,n]'
+    try:
+        moves = [int(p) for p in body.split(',')] if body.strip() else []
+    except ValueError:
+        return None, 'moves not int'
+    users_hist = [moves[0::2], moves[1::2]]
+    error = check_users_hist(board_size, users_hist)
+    if error is not None:
+        return None, error
+    return (board_size, users_hist, win_len), None
+
+
+def decode_game(text):
+    """ Game state of a move string of encode_game(), checked
+    Input:
+        text: str, move string 'n:m1,m2,...' or 'n/k:m1,m2,...'
+    Output:
+        board_size: int, grid size n of a play board nxn
+        users_hist: list, users' position history
+        win_len: int, k positions in a row to win, None if n
+    """
+    game, error = read_game(text)
+    if error is not None:
+        raise ValueError(f'decode_game(): <text> {text!r} {error}')
+    return game
+
+
+class WinWindows:
+    """ All windows of k positions in a row (horizontal, vertical and both
+        diagonals) on nxn grid, as a sequence of position ranges made on
+        demand, so that large boards need no set per window
+    Input:
+        board_size: int, grid size n of a play board nxn
+        win_len: int, k positions in a row to win
+    """
+
+    def __init__(self, board_size, win_len):
+        n, k = board_size, win_len
+        self.board_size = board_size
+        self.win_len = win_len
+        self.starts = array('i')
+        self.steps = array('i')
+        ## (step between positions, rows and columns of the first position)
+        for step, rows, cols in ((1, range(n), range(n - k + 1)),
+                                 (n, range(n - k + 1), range(n)),
+                                 (n + 1, range(n - k + 1), range(n - k + 1)),
+                                 (n - 1, range(n - k + 1), range(k - 1, n))):
+            for r in rows:
+                for c in cols:
+                    self.starts.append(1 + r * n + c)
+                    self.steps.append(step)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        start, step = self.starts[i], self.steps[i]
+        return range(start, start + self.win_len * step, step)
+
+    def __iter__(self):
+        for i in range(len(self.starts)):
+            yield self[i]
+
+    def sets(self):
+        """ The windows as a list of sets, as the winning lines of n in a
+            row, for the functions taking such a list and pruning it
+        """
+        return [set(w) for w in self]
+
+
+def new_game(board_size=3, users_hist=None, win_len=None):
+    """ Initialize tic-tac-toe game as a BoardState
+    Input:
+        board_size: int, grid size n of a play board nxn
+        users_hist: list, users' position history if there is
+        win_len: int, k positions in a row to win, n if None
+    Output:
+        board: BoardState, checked game state ready to play
+    """
+    users_hist, win_lines = init_game(board_size, users_hist, win_len)
+    return BoardState(board_size, win_lines, users_hist)
+
+
+def play_game(board, players):
+    """ Play a game silently until it stops
+    Input:
+        board: BoardState, game state to play on (modified in place)
+        players: list, two functions for player-1 and player-2, each
+            taking <board> and returning a position from board.available_pos
+    Output:
+        win: int, final win status as of check_win_status()
+    """
+    win = board.status
+    while win == 0:
+        win = board.make(players[len(board.moves) & 1](board))
+    return win
+
+
+class BoardState:
+    """ Compact game state of tic-tac-toe on nxn grid
+        Positions of each player are kept as bits of an int, and every
+        winning line with per-player counters. A move only updates the
+        counters of the lines through its position (2-4 full lines, or up
+        to 4k windows of k in a row), so make/unmake and the win/draw
+        status take no scan of the board.
+    Input:
+        board_size: int, grid size n of a play board nxn
+        win_lines: list of sets or WinWindows, winning lines of init_game()
+        users_hist: list, users' position history to start from, if any
+    Attributes:
+        bits: list, bit masks of positions taken by player-1 and player-2
+        users_hist: list, users' position history, updated with moves
+        moves: list, all positions in playing order
+        available_pos: list, available positions on play board (unordered)
+        line_counts: list, num of positions of each player on each line
+        n_open: list, num of lines still winnable by each player
+        n_live: int, num of lines still winnable by any player
+        buckets: list, buckets[player][m] is the set of lines still winnable
+            by the player, with some of its positions and m missing ones
+        status: int, win status as returned by check_win_status()
+    """
+
+    def __init__(self, board_size, win_lines, users_hist=None):
+        self.board_size = board_size
+        if isinstance(win_lines, WinWindows):
+            self.line_sets = win_lines
+        else:
+            self.line_sets = list(win_lines)
+        ## lines through each position, indexed by position number
+        self.cell_lines = [[] for _ in range(board_size ** 2 + 1)]
+        for i, w in enumerate(self.line_sets):
+            for p in w:
+                self.cell_lines[p].append(i)
+        self.line_len = [len(w) for w in self.line_sets]
+        self.win_len = max(self.line_len + [0])
+        self.reset(users_hist)
+
+    def reset(self, users_hist=None):
+        """ Start a new game, reusing the precomputed lines
+        """
+        n_pos = self.board_size ** 2
+        self.bits = [0, 0]
+        self.users_hist = [[], []]
+        self.moves = []
+        self.available_pos = list(range(1, n_pos + 1))
+        self._avail_idx = list(range(-1, n_pos))   ## index in available_pos
+        n_lines = len(self.line_sets)
+        self.line_counts = [[0] * n_lines, [0] * n_lines]
+        self.n_open = [n_lines, n_lines]
+        self.n_live = n_lines
+        self.buckets = [[set() for _ in range(self.win_len + 1)]
+                        for _ in range(2)]
+        self.status = 0
+        self._status_hist = []
+        if users_hist is not None:
+            for i in range(len(users_hist[0])):
+                self.make(users_hist[0][i])
+                if i < len(users_hist[1]):
+                    self.make(users_hist[1][i])
+        return self
+
+    def make(self, pos):
+        """ Put a position for the player in turn, and update win status
+        """
+        bit = 1 << pos
+        if pos < 1 or pos > self.board_size ** 2 \
+           or (self.bits[0] | self.bits[1]) & bit:
+            raise ValueError(f'BoardState.make(): <pos> {pos} not available')
+        player = len(self.moves) & 1
+        self.bits[player] |= bit
+        self.users_hist[player].append(pos)
+        self.moves.append(pos)
+        ## O(1) removal: move the last available position into its slot
+        i = self._avail_idx[pos]
+        last = self.available_pos.pop()
+        if last != pos:
+            self.available_pos[i] = last
+            self._avail_idx[last] = i
+        ## only the lines through <pos> change
+        mine = self.line_counts[player]
+        other = self.line_counts[1 - player]
+        my_buckets = self.buckets[player]
+        won = False
+        for i in self.cell_lines[pos]:
+            mine[i] += 1
+            missing = self.line_len[i] - mine[i]
+            if other[i] == 0:
+                if mine[i] > 1:
+                    my_buckets[missing + 1].remove(i)
+                my_buckets[missing].add(i)
+            elif mine[i] == 1:
+                self.buckets[1 - player][self.line_len[i] - other[i]].remove(i)
+            if mine[i] == 1:
+                self.n_open[1 - player] -= 1
+                if other[i] > 0:
+                    self.n_live -= 1
+            if missing == 0:
+                won = True
+        self._status_hist.append(self.status)
+        if self.status == 0:
+            if won:
+                self.status = player + 1
+            elif self.n_live == 0:
+                self.status = -1
+        return self.status
+
+    def unmake(self):
+        """ Take back the last move
+        """
+        pos = self.moves.pop()
+        player = len(self.moves) & 1
+        self.bits[player] &= ~(1 << pos)
+        self.users_hist[player].pop()
+        mine = self.line_counts[player]
+        other = self.line_counts[1 - player]
+        my_buckets = self.buckets[player]
+        for i in self.cell_lines[pos]:
+            mine[i] -= 1
+            missing = self.line_len[i] - mine[i]
+            if other[i] == 0:
+                my_buckets[missing - 1].remove(i)
+                if mine[i] > 0:
+                    my_buckets[missing].add(i)
+            elif mine[i] == 0:
+                self.buckets[1 - player][self.line_len[i] - other[i]].add(i)
+            if mine[i] == 0:
+                self.n_open[1 - player] += 1
+                if other[i] > 0:
+                    self.n_live += 1
+        self._avail_idx[pos] = len(self.available_pos)
+        self.available_pos.append(pos)
+        self.status = self._status_hist.pop()
+        return pos
+
+    def sync(self, users_hist):
+        """ Make the positions in <users_hist> not played yet, if it is a
+            continuation of this game
+        Input:
+            users_hist: list, users' position history of the same game
+        Output:
+            new_pos: list, positions made, or None if histories diverged
+        """
+        hist_0, hist_1 = self.users_hist
+        ## whole prefixes, a game made of other moves may end on the same
+        if users_hist[0][:len(hist_0)] != hist_0 \
+           or users_hist[1][:len(hist_1)] != hist_1:
+            return None
+        new_pos = []
+        while True:
+            player = len(self.moves) & 1
+            k = len(self.users_hist[player])
+            if k == len(users_hist[player]):
+                break
+            new_pos.append(users_hist[player][k])
+            self.make(new_pos[-1])
+        if len(users_hist[1 - player]) != len(self.users_hist[1 - player]):
+            return None
+        return new_pos
+
+    def win_pos_best(self, player, N=1):
+        """ Most frequent positions on the lines the player needs N more
+            positions to complete (as find_win_pos_best(), but read from
+            the line buckets without scanning the board)
+        Input:
+            player: int, 0 for player-1, 1 for player-2
+            N: int, num of positions to fill before satisfy a winning line,
+               less than the line length
+        Output:
+            win_pos_best: list, most frequent winning positions
+        """
+        lines = self.buckets[player][N] if N < len(self.buckets[player]) \
+            else ()
+        if len(lines) == 0:
+            return []
+        mine = self.bits[player]
+        if len(lines) == 1:
+            for i in lines:
+                return [p for p in self.line_sets[i] if not mine >> p & 1]
+        win_pos = Counter(p for i in lines for p in self.line_sets[i]
+                          if not mine >> p & 1)
+        count_max = max(win_pos.values())
+        return [k for k, c in win_pos.items() if c == count_max]
+
+    def is_live(self, i):
+        """ Check if the i-th line is not yet blocked by both players
+        """
+        return self.line_counts[0][i] == 0 or self.line_counts[1][i] == 0
+
+    def live_lines(self):
+        """ Winning lines not yet blocked by both players
+        """
+        c0, c1 = self.line_counts
+        return [w for i, w in enumerate(self.line_sets)
+                if c0[i] == 0 or c1[i] == 0]
+
+
+def board_symmetries(board_size):
+    """ The 8 symmetries of a square play board (rotations and reflections)
+    Input:
+        board_size: int, grid size n of a play board nxn
+    Output:
+        syms: list of 8 lists, syms[s][k] is the position where position k
+              goes under the s-th symmetry (syms[0] is the identity, and
+              index 0 is unused)
+    """
+    n = board_size
+    syms = []
+    for flip in (False, True):
+        for k in range(4):
+            perm = [0]
+            for pos in range(1, n ** 2 + 1):
+                r, c = divmod(pos - 1, n)
+                if flip:
+                    c = n - 1 - c
+                for _ in range(k):
+                    r, c = c, n - 1 - r
+                perm.append(1 + r * n + c)
+            syms.append(perm)
+    return syms
+
+
+def symmetry_tables(board_size, seed=None):
+    """ Tables of positions keyed under the 8 board symmetries, as used by
+        the solver and the opening book
+    Input:
+        board_size: int, grid size n of a play board nxn
+        seed: int, seed of the Zobrist keys, no keys if None
+    Output:
+        syms: list of 8 lists, board_symmetries()
+        inv_syms: list of 8 lists, inv_syms[s][syms[s][k]] == k
+        sym_keys: list, Zobrist key of a position taken by a player under
+                  each symmetry, sym_keys[player][pos][s], None if no <seed>
+    """
+    n_pos = board_size ** 2
+    syms = board_symmetries(board_size)
+    inv_syms = []
+    for perm in syms:
+        inv = [0] * (n_pos + 1)
+        for k, v in enumerate(perm):
+            inv[v] = k
+        inv_syms.append(inv)
+    if seed is None:
+        return syms, inv_syms, None
+    rng = random.Random(seed)
+    zobrist = [[rng.getrandbits(64) for _ in range(n_pos + 1)]
+               for _ in range(2)]
+    sym_keys = [[[zobrist[p][perm[pos]] for perm in syms]
+                 for pos in range(n_pos + 1)] for p in range(2)]
+    return syms, inv_syms, sym_keys
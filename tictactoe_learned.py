@@ -0,0 +1,491 @@
+"""
+Tic-Tac-Toe Learned Bot (small neural network valuing the position after
+each available move, trained on bot-vs-bot games, with NumPy)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+
+Features of a move are counted on the winning lines, so one model serves
+all board sizes: for the player making it and for the opponent, the number
+of lines still winnable by each, by how many positions they miss (bucket
+m for m missing, the last bucket for m or more), over the board size; and
+the share of the board filled. All moves of a position are valued in one
+forward pass, from the features of the position and the changes on the
+lines through each move, both by matmul.
+"""
+
+import os
+import random
+
+import numpy as np
+
+from tictactoe_engine import BoardState, init_game
+from tictactoe_with_bot import get_input_from_bot
+
+N_BUCKETS = 6                  ## lines missing 0, 1, ..., 4, 5+ positions
+N_FEATURES = 2 * N_BUCKETS + 1
+FEW_LINES = 40                 ## lines of the boards scored from scratch
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODEL_FILE = os.path.join(MODEL_DIR, 'learned.npz')
+## (board size, winning length) of the games to train on
+TRAIN_BOARDS = [(n, n) for n in range(3, 11)] \
+    + [(5, 4), (6, 4), (8, 4), (10, 4), (7, 5), (10, 5)]
+
+
+def model_path():
+    """ Default file of the learned model
+    """
+    return MODEL_FILE
+
+
+class LineFeatures:
+    """ Move features of one game (board size and winning length), with
+        the tables that do not change during the game
+    Input:
+        board: BoardState, a game to read the lines from
+    """
+
+    def __init__(self, board):
+        n_pos = board.board_size ** 2
+        k = board.win_len               ## all lines are this long
+        self.board_size = board.board_size
+        self.k = k
+        ## incidence of positions (row j for position j) and lines
+        self.inc = np.zeros((n_pos + 1, len(board.line_len)),
+                            dtype=np.float32)
+        for pos in range(1, n_pos + 1):
+            self.inc[pos, board.cell_lines[pos]] = 1
+        ## per state of a line (counts of the player in turn and of the
+        ## opponent, as mine + (k+1) * other), its buckets now and the
+        ## change by a move on it: the player's line one step further, and
+        ## the opponent's one blocked
+        onehot = np.eye(N_BUCKETS, dtype=np.float32)
+        self.now = np.zeros(((k + 1) ** 2, 2 * N_BUCKETS), dtype=np.float32)
+        self.delta = np.zeros_like(self.now)
+        for mine in range(k + 1):
+            for other in range(k + 1):
+                s = mine + (k + 1) * other
+                if other == 0 and mine < k:
+                    self.now[s, :N_BUCKETS] = onehot[min(k - mine,
+                                                         N_BUCKETS - 1)]
+                    self.delta[s, :N_BUCKETS] = \
+                        onehot[min(k - mine - 1, N_BUCKETS - 1)] \
+                        - self.now[s, :N_BUCKETS]
+                if mine == 0 and other < k:
+                    self.now[s, N_BUCKETS:] = onehot[min(k - other,
+                                                         N_BUCKETS - 1)]
+                    self.delta[s, N_BUCKETS:] = -self.now[s, N_BUCKETS:]
+        self.now /= self.board_size
+        self.delta /= self.board_size
+
+    def __call__(self, board, positions=None):
+        """ Features of the positions after each move of the player in turn
+        Input:
+            board: BoardState, game in progress of the same size
+            positions: list, moves to value, board.available_pos if None
+        Output:
+            x: numpy array (moves x N_FEATURES) of float32
+        """
+        if positions is None:
+            positions = board.available_pos
+        player = len(board.moves) & 1
+        state = np.array(board.line_counts[player]) \
+            + (self.k + 1) * np.array(board.line_counts[1 - player])
+        x = np.empty((len(positions), N_FEATURES), dtype=np.float32)
+        x[:, :-1] = self.now[state].sum(axis=0) \
+            + self.inc[positions] @ self.delta[state]
+        x[:, -1] = (len(board.moves) + 1) / len(self.inc)
+        return x
+
+
+class ValueModel:
+    """ Multilayer perceptron valuing positions for the player who just
+        moved: tanh(relu(x W1 + b1) w2 + b2), in [-1, 1] from loss to win
+    Input:
+        params: dict, numpy arrays 'W1', 'b1', 'w2', 'b2'
+    """
+
+    def __init__(self, params):
+        self.params = {k: np.asarray(v, dtype=np.float32)
+                       for k, v in params.items()}
+
+    @classmethod
+    def random(cls, hidden=32, seed=0):
+        """ Model with random weights, to be trained
+        """
+        rng = np.random.default_rng(seed)
+        return cls({'W1': rng.normal(0, N_FEATURES ** -0.5,
+                                     (N_FEATURES, hidden)),
+                    'b1': np.zeros(hidden),
+                    'w2': rng.normal(0, hidden ** -0.5, hidden),
+                    'b2': np.zeros(1)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(dict(data))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, **self.params)
+
+    def __call__(self, x):
+        """ Values of a batch of features (rows of x)
+        """
+        p = self.params
+        hidden = np.maximum(x @ p['W1'] + p['b1'], 0)
+        return np.tanh(hidden @ p['w2'] + p['b2'])
+
+    def fit(self, x, y, epochs=20, batch_size=256, lr=1e-3, seed=0):
+        """ Train on features <x> and target values <y> by least squares
+            with Adam updates
+        Output:
+            loss: float, mean squared error of the last epoch
+        """
+        rng = np.random.default_rng(seed)
+        p = self.params
+        moments = {k: [np.zeros_like(v), np.zeros_like(v)]
+                   for k, v in p.items()}
+        beta1, beta2, t = 0.9, 0.999, 0
+        for epoch in range(epochs):
+            order = rng.permutation(len(x))
+            total = 0.0
+            for start in range(0, len(x), batch_size):
+                rows = order[start:start + batch_size]
+                xb, yb = x[rows], y[rows]
+                h_in = xb @ p['W1'] + p['b1']
+                h = np.maximum(h_in, 0)
+                out = np.tanh(h @ p['w2'] + p['b2'])
+                err = out - yb
+                total += float((err * err).sum())
+                ## backward pass of the mean squared error
+                g_out = 2 * err * (1 - out * out) / len(rows)
+                g_h = np.outer(g_out, p['w2']) * (h_in > 0)
+                grads = {'W1': xb.T @ g_h, 'b1': g_h.sum(axis=0),
+                         'w2': h.T @ g_out, 'b2': g_out.sum(keepdims=True)}
+                t += 1
+                for k, g in grads.items():
+                    m, v = moments[k]
+                    m *= beta1
+                    m += (1 - beta1) * g
+                    v *= beta2
+                    v += (1 - beta2) * g * g
+                    p[k] -= (lr * (m / (1 - beta1 ** t))
+                             / (np.sqrt(v / (1 - beta2 ** t)) + 1e-8))
+        return total / len(x)
+
+
+class MoveScorer:
+    """ Scores of all moves of a position, ordered as the model values:
+        the first layer of the model is folded into the line tables of
+        LineFeatures, so that the features are never built, and the last
+        tanh (monotonic) is left out. Winning moves are not told apart.
+        Unless the board has up to FEW_LINES lines, the first layer of
+        every position is kept between calls, for each player in turn, and
+        updated on the lines through the moves made since, so that
+        following a game costs the lines of its last moves; on boards of
+        up to 4x4, the best moves of the positions seen are kept as well.
+    Input:
+        features: LineFeatures, of the game
+        model: ValueModel, of the scores
+        max_entries: int, best moves kept before they are cleared
+    """
+
+    def __init__(self, features, model, max_entries=100000):
+        p = model.params
+        self.k = features.k
+        size, n_lines = features.inc.shape      ## positions + 1
+        self.hidden = len(p['b1'])
+        ## first layer per line state (mine + (k+1) * other, counts of the
+        ## player in turn and of the opponent): change by a move, then now
+        self.table = np.concatenate([features.delta @ p['W1'][:-1],
+                                     features.now @ p['W1'][:-1]],
+                                    axis=1).astype(np.float64)
+        ## lines x positions, and a last column of ones to sum all lines
+        self.inc_t = np.ones((n_lines, size + 1))
+        self.inc_t[:, :size] = features.inc.T
+        self.b1 = p['b1']
+        self.w_ply = p['W1'][-1] / size
+        self.w2 = p['w2'].astype(np.float64)
+        self.few_lines = n_lines <= FEW_LINES
+        ## per player in turn: [moves, table row of each line, sums of the
+        ## table rows by position and of all lines, -inf at the positions
+        ## taken]
+        self.games = [None, None]
+        taken = np.zeros(size)
+        taken[0] = -np.inf
+        self.empty = ([0] * n_lines,
+                      self.inc_t.T @ np.repeat(self.table[:1], n_lines, 0),
+                      taken)
+        self.max_entries = max_entries
+        self.best = {} if size <= 17 else None
+
+    def _game(self, board, player):
+        """ Kept sums of the first layer for <player> in turn, brought up
+            to date with <board>
+        """
+        moves = board.moves
+        game = self.games[player]
+        if game is None or len(game[0]) > len(moves) \
+                or moves[:len(game[0])] != game[0]:
+            game = [[], list(self.empty[0]), self.empty[1].copy(),
+                    self.empty[2].copy()]
+            self.games[player] = game
+        if len(game[0]) < len(moves):
+            mine = board.line_counts[player]
+            other = board.line_counts[1 - player]
+            k1 = self.k + 1
+            states = game[1]
+            new = moves[len(game[0]):]
+            changed = list({i for pos in new for i in board.cell_lines[pos]})
+            rows = [mine[i] + k1 * other[i] for i in changed]
+            rows += [states[i] for i in changed]
+            rows = self.table[rows]
+            game[2] += self.inc_t[changed].T @ (rows[:len(changed)]
+                                                - rows[len(changed):])
+            for i in changed:
+                states[i] = mine[i] + k1 * other[i]
+            for pos in new:
+                game[3][pos] = -np.inf
+            game[0] = list(moves)
+        return game
+
+    def scores(self, board):
+        """ Scores of all positions for the player in turn
+        Output:
+            scores: numpy array (positions + 1,) of float64, -inf for the
+                positions taken and index 0
+        """
+        player = len(board.moves) & 1
+        if self.few_lines:
+            k1 = self.k + 1
+            sums = self.inc_t.T @ self.table[
+                [m + k1 * o for m, o in zip(board.line_counts[player],
+                                            board.line_counts[1 - player])]]
+        else:
+            game = self._game(board, player)
+            sums = game[2]
+        hidden = sums[:-1, :self.hidden] \
+            + (sums[-1, self.hidden:] + self.b1
+               + (len(board.moves) + 1) * self.w_ply)
+        np.maximum(hidden, 0, out=hidden)
+        scores = hidden @ self.w2
+        if self.few_lines:
+            scores[[0] + board.moves] = -np.inf
+        else:
+            scores += game[3]
+        return scores
+
+    def __call__(self, board, positions):
+        """ Scores of moves of the player in turn
+        Input:
+            board: BoardState, game in progress of the same size
+            positions: list, moves to score
+        Output:
+            scores: numpy array (moves,) of float64
+        """
+        return self.scores(board)[positions]
+
+    def best_moves(self, board):
+        """ Available positions of the best score (within 1e-6)
+        """
+        if self.best is None:
+            scores = self.scores(board)
+            return np.flatnonzero(scores >= scores.max() - 1e-6).tolist()
+        key = (board.bits[0], board.bits[1])
+        found = self.best.get(key)
+        if found is None:
+            if len(self.best) >= self.max_entries:
+                self.best.clear()
+            scores = self.scores(board)
+            found = np.flatnonzero(scores >= scores.max() - 1e-6).tolist()
+            self.best[key] = found
+        return found
+
+
+_models = {}       ## path -> ValueModel or None, loaded at first use
+_features = {}     ## (board size, winning length) -> LineFeatures
+_scorers = {}      ## (model, board size, winning length) -> MoveScorer
+
+
+def get_model(path=None):
+    """ Learned model, loaded when first asked for
+    Output:
+        model: ValueModel, or None if there is no model file
+    """
+    if path is None:
+        path = model_path()
+    if path not in _models:
+        _models[path] = ValueModel.load(path) if os.path.exists(path) \
+            else None
+    return _models[path]
+
+
+def get_features(board):
+    """ LineFeatures of the board size and winning length of a game
+    """
+    key = (board.board_size, board.win_len)
+    if key not in _features:
+        _features[key] = LineFeatures(board)
+    return _features[key]
+
+
+def get_input_from_learned(users_hist, available_pos, win_lines,
+                           board_size, bot_level=1.0, rng=random, board=None,
+                           model=None):
+    """ Get a position from the learned bot (same inputs as
+        get_input_from_bot()): a winning move if there is, otherwise the
+        move the model values best, or with probability 1 - bot_level**1.5
+        the move of get_input_from_bot() at the same level
+    Input:
+        users_hist: list, users' position history
+        available_pos: list, available positions on play board
+        win_lines: list of sets, collection of winning conditions
+        board_size: int, grid size n of a play board nxn
+        bot_level: float, smart level of bot
+        rng: random.Random, random generator, the shared one by default
+        board: BoardState, state of the same game, made from the other
+            inputs if None
+        model: ValueModel, get_model() if None
+    Output:
+        pos_chosen: int, position chosen for the bot
+    """
+    if model is None:
+        model = get_model()
+    if model is None:
+        raise ValueError('get_input_from_learned(): no model file, see '
+                         + 'train_model()')
+    if board is None:
+        win_len = len(win_lines[0]) if len(win_lines) > 0 else board_size
+        board = BoardState(board_size,
+                           init_game(board_size, None, win_len)[1], users_hist)
+    bot_prob = bot_level ** 1.5 + 1e-6
+    if rng.random() >= bot_prob:
+        return get_input_from_bot(users_hist, available_pos, win_lines,
+                                  board_size, bot_level, rng, board)
+    player = len(board.moves) & 1
+    if len(board.buckets[player][1]) > 0:
+        return rng.choice(board.win_pos_best(player, 1))
+    key = (model, board.board_size, board.win_len)
+    if key not in _scorers:
+        _scorers[key] = MoveScorer(get_features(board), model)
+    best = _scorers[key].best_moves(board)
+    return best[rng.randrange(len(best))]
+
+
+def record_features(paths):
+    """ Training set from recorded games: the features of every move
+        played, and the game result for the player making it
+    Input:
+        paths: list, game record files (see tictactoe_records)
+    Output:
+        x: numpy array (moves x N_FEATURES) of float32
+        y: numpy array (moves,) of float32, 1: won, 0: draw, -1: lost
+    """
+    from tictactoe_records import read_games
+
+    boards = {}
+    xs, ys = [], []
+    for game in read_games(*paths):
+        key = (game.board_size, game.win_len)
+        if key not in boards:
+            boards[key] = BoardState(game.board_size,
+                                     init_game(game.board_size, None,
+                                               game.win_len)[1])
+        board = boards[key].reset()
+        features = get_features(board)
+        for ply, pos in enumerate(game.moves):
+            xs.append(features(board, [pos]))
+            if game.result == -1:
+                ys.append(0.0)
+            else:
+                ys.append(1.0 if game.result == (ply & 1) + 1 else -1.0)
+            board.make(pos)
+    return np.concatenate(xs), np.array(ys, dtype=np.float32)
+
+
+def train_model(boards=TRAIN_BOARDS, n_games=1000, rounds=3, path=None,
+                hidden=32, epochs=20, seed=0, workers=1, verbose=True):
+    """ Train the learned model offline on self-play games: first games of
+        the heuristic bots (bot_vs_bot_stats()), then in each further round
+        games of the learned bot against the heuristic and itself
+    Input:
+        boards: list, (board size, winning length) of the games to play
+        n_games: int, number of games per board and pair of bots
+        rounds: int, rounds of playing and training
+        path: str, model file, model_path() by default
+        hidden: int, num of hidden units
+        epochs: int, training epochs per round
+        seed: int, seed of the games and weights
+        workers: int, number of processes playing the games
+        verbose: bool, print the progress
+    Output:
+        model: ValueModel, trained and saved to <path>
+    """
+    import tempfile
+    from tictactoe_with_bot import bot_vs_bot_stats, shard_seeds
+
+    if path is None:
+        path = model_path()
+    model = ValueModel.random(hidden, seed)
+    seeds = iter(shard_seeds(seed, rounds * len(boards) * 4))
+    with tempfile.TemporaryDirectory() as tmp:
+        for r in range(rounds):
+            ## lower levels play some heuristic moves, to see more positions
+            if r == 0:
+                pairs = [((get_input_from_bot, get_input_from_bot), lv)
+                         for lv in ((1.0, 1.0), (1.0, 0.7), (0.7, 1.0),
+                                    (0.7, 0.7))]
+            else:
+                learned = LearnedInput(path)
+                pairs = [((learned, get_input_from_bot), (0.95, 1.0)),
+                         ((get_input_from_bot, learned), (1.0, 0.95)),
+                         ((learned, learned), (0.95, 0.95)),
+                         ((learned, learned), (0.8, 0.8))]
+            for n, k in boards:
+                for bot_inputs, (l1, l2) in pairs:
+                    ## all games go to one file per worker
+                    rates = bot_vs_bot_stats(n, l1, l2, n_games, workers,
+                                             next(seeds), win_len=k,
+                                             record=os.path.join(tmp, 'games'),
+                                             bot_inputs=bot_inputs)
+                    if verbose:
+                        print(f'round {r}, {n}x{n} ({k} in a row), levels '
+                              + f'{l1}/{l2}: rates {rates}')
+            ## train on the games of all rounds so far
+            x, y = record_features([os.path.join(tmp, f)
+                                    for f in sorted(os.listdir(tmp))
+                                    if not f.endswith('.idx')])
+            loss = model.fit(x, y, epochs, seed=seed + r)
+            model.save(path)
+            _models[path] = model
+            _scorers.clear()           ## tables of the weights before fit
+            if verbose:
+                print(f'round {r}: {len(x)} moves, loss {loss:.4f}')
+    return model
+
+
+class LearnedInput:
+    """ get_input_from_learned() with the model of a file, as a strategy
+        that can be sent to worker processes
+    Input:
+        path: str, model file
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def __call__(self, users_hist, available_pos, win_lines, board_size,
+                 bot_level=1.0, rng=random, board=None):
+        return get_input_from_learned(users_hist, available_pos, win_lines,
+                                      board_size, bot_level, rng, board,
+                                      get_model(self.path))
+
+
+if __name__ == '__main__':
+    ## e.g. `python3 tictactoe_learned.py 3000 2` for 3000 games per
+    ## board and pair of bots, in 2 rounds
+    import sys
+    train_model(n_games=int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+                rounds=int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+                workers=os.cpu_count())
@@ -0,0 +1,298 @@
+"""
+Tic-Tac-Toe Monte Carlo Tree Search Bot (UCT search under a time budget,
+with heuristic-bot rollouts, reused subtrees and optional worker processes)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import math
+import random
+import time
+
+from tictactoe_engine import BoardState, init_game
+from tictactoe_with_bot import get_input_from_bot
+
+
+class Node:
+    """ Node of the search tree, for the position after <pos>
+        wins counts 1 for a won and 0.5 for a drawn playout of the player
+        who made <pos>.
+    """
+    __slots__ = ('pos', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, pos=None, parent=None):
+        self.pos = pos
+        self.parent = parent
+        self.children = []
+        self.untried = None        ## moves not expanded, set at first visit
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTS:
+    """ Monte Carlo tree search of one game at a time: the tree below the
+        current position is kept, and reused for the next move if the game
+        goes on from there
+    Input:
+        board_size: int, grid size n of a play board nxn
+        win_len: int, k positions in a row to win, n if None
+        rollout_level: float, smart level of the heuristic bot playing out
+            the games, 0 for random play
+        c: float, exploration constant of UCT
+        seed: int, seed of the random generator, or None
+    """
+
+    def __init__(self, board_size, win_len=None, rollout_level=0.5, c=1.4,
+                 seed=None):
+        self.board_size = board_size
+        self.board = BoardState(board_size,
+                                init_game(board_size, None, win_len)[1])
+        self.rollout_level = rollout_level
+        self.c = c
+        self.rng = random.Random(seed)
+        self.root = Node()
+        self.n_playouts = 0
+
+    def _move_root(self, moves):
+        """ Make the root the node after <moves>, keeping its subtree if
+            the current root's game leads there
+        """
+        board = self.board
+        n_root = len(board.moves)
+        if len(moves) < n_root or list(moves[:n_root]) != board.moves:
+            board.reset()
+            self.root = Node()
+            n_root = 0
+        for pos in moves[n_root:]:
+            child = None
+            for node in self.root.children:
+                if node.pos == pos:
+                    child = node
+                    break
+            board.make(pos)
+            self.root = Node(pos) if child is None else child
+        self.root.parent = None
+
+    def search(self, users_hist, time_limit=1.0, max_playouts=None):
+        """ Search the position for a time budget
+        Input:
+            users_hist: list, users' position history
+            time_limit: float, seconds for the search, None for no limit
+            max_playouts: int, stop earlier after this many playouts
+        Output:
+            stats: dict, root move -> [visits, wins] of the search tree
+        """
+        moves = []
+        for i in range(len(users_hist[0])):
+            moves.append(users_hist[0][i])
+            if i < len(users_hist[1]):
+                moves.append(users_hist[1][i])
+        self._move_root(moves)
+        if self.board.status != 0:
+            raise ValueError('MCTS.search(): game already stopped')
+        deadline = math.inf if time_limit is None \
+            else time.perf_counter() + time_limit
+        n_playouts = 0
+        while max_playouts is None or n_playouts < max_playouts:
+            self._playout()
+            n_playouts += 1
+            if n_playouts & 7 == 0 and time.perf_counter() > deadline:
+                break
+        self.n_playouts = n_playouts
+        return {node.pos: [node.visits, node.wins]
+                for node in self.root.children}
+
+    def _playout(self):
+        board = self.board
+        node = self.root
+        n_root = len(board.moves)
+        status = board.status
+        ## selection, down to a node with moves not expanded yet
+        while status == 0 and node.untried is not None \
+                and len(node.untried) == 0:
+            node = self._select(node)
+            status = board.make(node.pos)
+        ## expansion
+        if status == 0:
+            if node.untried is None:
+                node.untried = self._candidates()
+                self.rng.shuffle(node.untried)
+            child = Node(node.untried.pop(), node)
+            node.children.append(child)
+            node = child
+            status = board.make(node.pos)
+        ## simulation
+        n_node = len(board.moves)
+        if status == 0:
+            status = self._rollout()
+        while len(board.moves) > n_node:
+            board.unmake()
+        ## back-propagation, on the way back to the root position
+        while node is not None:
+            node.visits += 1
+            if status == -1:
+                node.wins += 0.5
+            elif status == ((len(board.moves) - 1) & 1) + 1:
+                node.wins += 1
+            if node is not self.root:
+                board.unmake()
+            node = node.parent
+
+    def _candidates(self):
+        """ Moves worth searching: a winning move, else a block of the
+            opponent's winning move, else the positions on lines some
+            player has started and can still complete (all positions on an
+            empty board)
+        """
+        board = self.board
+        player = len(board.moves) & 1
+        for p in (player, 1 - player):
+            if len(board.buckets[p][1]) > 0:
+                return board.win_pos_best(p, 1)
+        taken = board.bits[0] | board.bits[1]
+        near = set()
+        for buckets in board.buckets:
+            for lines in buckets[2:]:
+                for i in lines:
+                    near.update(p for p in board.line_sets[i]
+                                if not taken >> p & 1)
+        return list(near) if len(near) > 0 else list(board.available_pos)
+
+    def _select(self, node):
+        log_n = math.log(node.visits)
+        c = self.c
+        best, best_score = None, -1.0
+        for child in node.children:
+            score = child.wins / child.visits \
+                + c * math.sqrt(log_n / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def _rollout(self):
+        """ Play the game out from the current position
+        Output:
+            status: int, final win status
+        """
+        board = self.board
+        rng = self.rng
+        level = self.rollout_level
+        status = 0
+        while status == 0:
+            if level > 0:
+                pos = get_input_from_bot(board.users_hist, board.available_pos,
+                                         board.line_sets, self.board_size,
+                                         level, rng, board=board)
+            else:
+                pos = rng.choice(board.available_pos)
+            status = board.make(pos)
+        return status
+
+
+_searchers = {}   ## MCTS per (board size, winning length) in each process,
+                  ## keeping its tree between moves
+
+
+def mcts_root_stats(users_hist, board_size, win_len, time_limit,
+                    rollout_level=0.5, seed=None, max_playouts=None,
+                    keep_tree=True):
+    """ Root statistics of a search by the MCTS of this process, for
+        root-parallel search in worker processes (see MCTS.search())
+    Input:
+        seed: int, seed of the random generator for this search, or None
+            to go on with the searcher's own
+        keep_tree: bool, reuse the tree of the searcher's last search if
+            the game goes on from there, else search from a new tree
+    Output:
+        stats: dict, root move -> [visits, wins]
+        n_playouts: int, number of playouts of the search
+    """
+    key = (board_size, win_len)
+    if key not in _searchers:
+        _searchers[key] = MCTS(board_size, win_len, rollout_level, seed=seed)
+    searcher = _searchers[key]
+    searcher.rollout_level = rollout_level
+    if seed is not None:
+        searcher.rng.seed(seed)
+    if not keep_tree:
+        searcher.board.reset()
+        searcher.root = Node()
+    stats = searcher.search(users_hist, time_limit, max_playouts)
+    return stats, searcher.n_playouts
+
+
+_pools = {}       ## num of workers -> ProcessPoolExecutor
+_last_rng = [None]  ## rng of the last in-process search, whose games the
+                    ## searcher's tree belongs to
+last_search = {}  ## playouts, seconds and playouts/sec of the last search
+
+
+def get_input_from_mcts(users_hist, available_pos, win_lines, board_size,
+                        bot_level=1.0, rng=random, board=None,
+                        time_limit=1.0, workers=1, verbose=False,
+                        max_playouts=None):
+    """ Get a position from the MCTS bot (same inputs as get_input_from_bot()):
+        the most visited move of a search for <time_limit> seconds, in
+        <workers> processes searching the same position independently with
+        their statistics merged
+        Each search is seeded from <rng>, and reuses the tree of the last
+        one only if made with the same <rng> (in workers: only with the
+        shared generator), so that a seeded <rng> and <max_playouts> with
+        no <time_limit> give the same moves on every run.
+    Input:
+        users_hist: list, users' position history
+        available_pos: list, available positions on play board
+        win_lines: list of sets, collection of winning conditions
+        board_size: int, grid size n of a play board nxn
+        bot_level: float, smart level of the rollout bots
+        rng: random.Random, random generator (seeds of the searches, and
+            ties of visits)
+        board: BoardState, state of the same game, for its winning length
+        time_limit: float, seconds for the search of a move, None for no
+            limit
+        workers: int, number of processes searching, 1 for no pool
+        verbose: bool, print the playouts and playouts/sec of the search
+        max_playouts: int, playouts of a search (of each worker) at most
+    Output:
+        pos_chosen: int, position chosen for the bot
+    """
+    if board is not None:
+        win_len = board.win_len
+    else:
+        win_len = len(win_lines[0]) if len(win_lines) > 0 else board_size
+    t0 = time.perf_counter()
+    if workers <= 1:
+        keep_tree = _last_rng[0] is rng
+        _last_rng[0] = rng
+        stats, n_playouts = mcts_root_stats(users_hist, board_size, win_len,
+                                            time_limit, bot_level,
+                                            rng.getrandbits(64), max_playouts,
+                                            keep_tree)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(workers)
+        seeds = [rng.getrandbits(64) for _ in range(workers)]
+        results = list(_pools[workers].map(
+            mcts_root_stats, [users_hist] * workers, [board_size] * workers,
+            [win_len] * workers, [time_limit] * workers,
+            [bot_level] * workers, seeds, [max_playouts] * workers,
+            [rng is random] * workers))
+        stats, n_playouts = {}, 0
+        for s, n in results:
+            for pos, (visits, wins) in s.items():
+                if pos in stats:
+                    stats[pos][0] += visits
+                    stats[pos][1] += wins
+                else:
+                    stats[pos] = [visits, wins]
+            n_playouts += n
+    seconds = time.perf_counter() - t0
+    last_search.update({'playouts': n_playouts, 'seconds': seconds,
+                        'playouts_per_sec': n_playouts / seconds})
+    if verbose:
+        print('   (searched {} playouts in {:.2f}s, {:.0f} playouts/s)'.format(
+            n_playouts, seconds, n_playouts / seconds))
+    most = max(v[0] for v in stats.values())
+    return rng.choice([pos for pos, v in stats.items() if v[0] == most])
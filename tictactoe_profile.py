@@ -0,0 +1,213 @@
+"""
+Tic-Tac-Toe Profiling (opt-in timers and counters of the game loops and
+the bot, per board size, with a summary report)
+
+    with Profile() as prof:
+        bot_vs_bot_stats(5, 0.5, 0.5, 1000)
+    print(prof.report())
+
+The game loops and the bot check the module attribute <active> and skip
+all measuring while it is None, so that profiling costs next to nothing
+when not used.
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+from functools import wraps
+from time import perf_counter
+
+active = None   ## Profile collecting in this process, None if disabled
+
+
+class Profile:
+    """ Timers and counters of one profiling run, a context manager which
+        makes it the active profile
+        Timers: 'bot' (bot decisions), 'win_check' (moves with their win
+        status, and check_win_status()), 'prune' (update_winlines()) and
+        'render' (board drawing). Counters: 'games', 'moves',
+        'lines_pruned' (lines blocked by both players, no longer checked),
+        and the depth (N positions missing on the line) at which
+        get_input_from_bot() found its move, 0 for a random move.
+    Input:
+        callback: function, called as callback(board_size, name, value)
+            for each measure, if given
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.board_size = None      ## board size of the games measured
+        self.timers = {}            ## (board_size, name) -> [calls, secs,
+                                    ##  max secs]
+        self.counters = {}          ## (board_size, name) -> count
+        self.depths = {}            ## (board_size, depth) -> count
+        self._outer = None
+
+    def __enter__(self):
+        global active
+        self._outer = active
+        active = self
+        return self
+
+    def __exit__(self, *exc):
+        global active
+        active = self._outer
+        return False
+
+    def add_time(self, name, seconds):
+        """ Add the seconds of one call of a timed phase
+        """
+        t = self.timers.get((self.board_size, name))
+        if t is None:
+            self.timers[(self.board_size, name)] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+        if self.callback is not None:
+            self.callback(self.board_size, name, seconds)
+
+    def count(self, name, n=1):
+        """ Add <n> to a counter
+        """
+        key = (self.board_size, name)
+        self.counters[key] = self.counters.get(key, 0) + n
+        if self.callback is not None:
+            self.callback(self.board_size, name, n)
+
+    def add_depth(self, depth):
+        """ Count a move of get_input_from_bot() found at <depth>
+        """
+        key = (self.board_size, depth)
+        self.depths[key] = self.depths.get(key, 0) + 1
+        if self.callback is not None:
+            self.callback(self.board_size, 'depth', depth)
+
+    def make(self, board, pos):
+        """ board.make(pos), timed as the win check, with the lines it
+            blocked counted as pruned
+        """
+        n_live = board.n_live
+        t0 = perf_counter()
+        status = board.make(pos)
+        self.add_time('win_check', perf_counter() - t0)
+        self.count('moves')
+        self.count('lines_pruned', n_live - board.n_live)
+        return status
+
+    def play_game(self, board, players):
+        """ play_game() of the engine, with the players timed as the bot
+        """
+        self.board_size = board.board_size
+        self.count('games')
+        win = board.status
+        while win == 0:
+            t0 = perf_counter()
+            pos = players[len(board.moves) & 1](board)
+            self.add_time('bot', perf_counter() - t0)
+            win = self.make(board, pos)
+        return win
+
+    def merge(self, other):
+        """ Add the measures of another Profile, eg. of a worker process
+        """
+        for key, (calls, secs, most) in other.timers.items():
+            t = self.timers.setdefault(key, [0, 0.0, 0.0])
+            t[0] += calls
+            t[1] += secs
+            t[2] = max(t[2], most)
+        for mine, theirs in ((self.counters, other.counters),
+                             (self.depths, other.depths)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+        return self
+
+    def __getstate__(self):
+        ## the callback stays in its process
+        state = self.__dict__.copy()
+        state['callback'] = None
+        state['_outer'] = None
+        return state
+
+    def report(self):
+        """ Summary of the measures per board size
+        Output:
+            text: str, lines of timers, counters and bot depths
+        """
+        sizes = {k[0] for k in self.timers} | {k[0] for k in self.counters} \
+            | {k[0] for k in self.depths}
+        lines = []
+        for n in sorted(sizes, key=lambda s: (s is None, s or 0)):
+            lines.append('## board size: {}'.format('-' if n is None
+                                                    else f'{n}x{n}'))
+            timers = [(name, t) for (s, name), t in self.timers.items()
+                      if s == n]
+            total = sum(t[1] for _, t in timers)
+            for name, (calls, secs, most) in sorted(
+                    timers, key=lambda x: -x[1][1]):
+                lines.append('{:>12}: {:>9} calls {:>10.1f} ms {:>5.1f}% '
+                             '{:>9.1f} us/call {:>9.1f} us max'.format(
+                                 name, calls, 1e3 * secs,
+                                 100 * secs / total if total > 0 else 0.0,
+                                 1e6 * secs / calls, 1e6 * most))
+            for (s, name), c in sorted(self.counters.items(),
+                                       key=lambda x: x[0][1]):
+                if s == n:
+                    lines.append(f'{name:>12}: {c:>9}')
+            depths = sorted((d, c) for (s, d), c in self.depths.items()
+                            if s == n)
+            if len(depths) > 0:
+                n_moves = sum(c for _, c in depths)
+                lines.append('  bot depths: ' + ', '.join(
+                    '{}: {:.1%}'.format(d if d > 0 else 'random', c / n_moves)
+                    for d, c in depths))
+        return '\n'.join(lines)
+
+
+def timed(name):
+    """ Decorator timing each call of a function as phase <name> of the
+        active profile, if any
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            prof = active
+            if prof is None:
+                return f(*args, **kwargs)
+            t0 = perf_counter()
+            result = f(*args, **kwargs)
+            prof.add_time(name, perf_counter() - t0)
+            return result
+        return wrapper
+    return decorator
+
+
+def main_profile(argv=None):
+    """ Command line entry: profile bot-vs-bot games on some board sizes
+    """
+    import argparse
+    ## the Profile of the imported module, not of __main__
+    from tictactoe_profile import Profile
+    from tictactoe_with_bot import bot_vs_bot_stats
+    parser = argparse.ArgumentParser(
+        description='Where the time goes in bot-vs-bot games')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 5, 7, 9])
+    parser.add_argument('--win-len', type=int,
+                        help='k in a row to win, n if not given')
+    parser.add_argument('--levels', type=float, nargs=2, default=[0.5, 0.5])
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    with Profile() as prof:
+        for n in args.sizes:
+            win_len = None if args.win_len is None else min(n, args.win_len)
+            bot_vs_bot_stats(n, args.levels[0], args.levels[1], args.games,
+                             args.workers, args.seed, win_len=win_len)
+    print(prof.report())
+    return prof
+
+
+if __name__ == '__main__':
+    main_profile()
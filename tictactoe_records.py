@@ -0,0 +1,202 @@
+"""
+Tic-Tac-Toe Game Records (append-only binary files of played games, e.g.
+bot-vs-bot games as training data)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+
+File layout (little endian):
+    file header:   b'TTTR', version (uint8), 3 reserved bytes
+    chunk:         b'CHNK', num of games (uint32), payload size (uint32),
+                   then the game records of the chunk
+    game record:   board_size (uint8), win_len (uint8), bot1_level and
+                   bot2_level (float32), seed (uint64), num of moves (uint16),
+                   result (int8, as check_win_status()), moves (uint16 each)
+Index file (path + '.idx'): offset (uint64) and num of games (uint32) of
+each chunk, appended after the chunk is written.
+
+Saved games (text): one move string of encode_game() per line, eg. '3:5,1,9',
+with empty lines and lines starting with '#' skipped.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from collections import namedtuple
+
+from tictactoe_engine import decode_game, encode_game
+
+FILE_HEADER = struct.Struct('<4sB3x')
+CHUNK_HEADER = struct.Struct('<4sII')
+GAME_HEADER = struct.Struct('<BBffQHb')
+INDEX_ENTRY = struct.Struct('<QI')
+
+GameRecord = namedtuple('GameRecord', ['board_size', 'win_len', 'bot1_level',
+                                       'bot2_level', 'seed', 'moves',
+                                       'result'])
+
+
+class GameRecordWriter:
+    """ Streaming writer of game records, buffering a chunk of games in
+        memory and appending it to the file when full
+    Input:
+        path: str, record file, appended to if it exists
+        chunk_games: int, num of games per chunk
+    """
+
+    def __init__(self, path, chunk_games=4096):
+        self.path = path
+        self.chunk_games = chunk_games
+        self.buffer = bytearray()
+        self.n_buffered = 0
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(b'TTTR', 1))
+        self.index = open(path + '.idx', 'ab')
+
+    def write(self, board_size, win_len, bot_levels, seed, moves, result):
+        """ Add a game
+        Input:
+            board_size: int, grid size n of a play board nxn
+            win_len: int, k positions in a row to win
+            bot_levels: tuple, smart levels of bot-1 and bot-2
+            seed: int, seed of the games' random generator, 0 if not seeded,
+                kept as its lowest 64 bits (a negative one as unsigned)
+            moves: list, positions in playing order
+            result: int, final win status as check_win_status()
+        """
+        self.buffer += GAME_HEADER.pack(board_size, win_len, bot_levels[0],
+                                        bot_levels[1],
+                                        seed & 0xFFFFFFFFFFFFFFFF, len(moves),
+                                        result)
+        self.buffer += array('H', moves).tobytes()
+        self.n_buffered += 1
+        if self.n_buffered >= self.chunk_games:
+            self.flush()
+
+    def flush(self):
+        """ Append the buffered games as a chunk
+        """
+        if self.n_buffered == 0:
+            return
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(b'CHNK', self.n_buffered,
+                                          len(self.buffer)))
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.index.write(INDEX_ENTRY.pack(offset, self.n_buffered))
+        self.index.flush()
+        self.buffer = bytearray()
+        self.n_buffered = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameRecordReader:
+    """ Reader of a game record file, memory-mapped so that games are
+        decoded one at a time
+    Input:
+        path: str, record file written by GameRecordWriter
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != b'TTTR' or version != 1:
+            raise ValueError(f'GameRecordReader(): <path> {path} not a '
+                             + 'record file')
+        self.chunks = self._read_index()
+
+    def _read_index(self):
+        """ (offset, num of games) of the chunks, from the index file, or by
+            walking the chunk headers if there is no index
+        """
+        chunks = []
+        if os.path.exists(self.path + '.idx'):
+            with open(self.path + '.idx', 'rb') as f:
+                raw = f.read()
+            return list(INDEX_ENTRY.iter_unpack(raw))
+        offset = FILE_HEADER.size
+        while offset + CHUNK_HEADER.size <= len(self.data):
+            magic, n_games, size = CHUNK_HEADER.unpack_from(self.data, offset)
+            if magic != b'CHNK' \
+               or offset + CHUNK_HEADER.size + size > len(self.data):
+                break                    ## chunk cut off by a crash
+            chunks.append((offset, n_games))
+            offset += CHUNK_HEADER.size + size
+        return chunks
+
+    def __len__(self):
+        return sum(n for _, n in self.chunks)
+
+    def __iter__(self):
+        for i in range(len(self.chunks)):
+            for game in self.chunk(i):
+                yield game
+
+    def chunk(self, i):
+        """ Generator of the games in the i-th chunk
+        """
+        offset, n_games = self.chunks[i]
+        offset += CHUNK_HEADER.size
+        for _ in range(n_games):
+            board_size, win_len, level_1, level_2, seed, n_moves, result = \
+                GAME_HEADER.unpack_from(self.data, offset)
+            offset += GAME_HEADER.size
+            moves = array('H', self.data[offset:offset + 2 * n_moves])
+            offset += 2 * n_moves
+            yield GameRecord(board_size, win_len, level_1, level_2, seed,
+                             moves, result)
+
+    def close(self):
+        self.data.close()
+
+
+def read_games(*paths):
+    """ Generator of the games in one or more record files
+    """
+    for path in paths:
+        reader = GameRecordReader(path)
+        for game in reader:
+            yield game
+        reader.close()
+
+
+def save_games(path, games):
+    """ Write games as lines of move strings
+    Input:
+        path: str, text file of saved games, overwritten
+        games: iterable, (board_size, users_hist, win_len) of each game
+    """
+    with open(path, 'w') as f:
+        for board_size, users_hist, win_len in games:
+            f.write(encode_game(board_size, users_hist, win_len) + '\n')
+
+
+def load_games(path):
+    """ Generator of the checked games of a text file of saved games
+    Input:
+        path: str, text file of saved games
+    Output:
+        (board_size, users_hist, win_len) of each game, as decode_game()
+    """
+    with open(path) as f:
+        for i, line in enumerate(f, 1):
+            if len(line.strip()) == 0 or line.startswith('#'):
+                continue
+            try:
+                yield decode_game(line)
+            except ValueError as e:
+                raise ValueError(f'load_games(): {path}, line {i}: {e}')
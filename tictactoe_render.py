@@ -0,0 +1,173 @@
+"""
+Tic-Tac-Toe Board Rendering (box-drawing of play boards, redrawn in place
+cell by cell on ANSI terminals)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import atexit
+import os
+import sys
+
+from tictactoe_profile import timed
+
+COLORS = {'X': '\033[31m', 'O': '\033[34m'}   ## font colors of the players
+RESET = '\033[0;0m'
+
+
+def color_cell(text, s):
+    """ Cell <text> of content <s> with the font color of a player, if any
+    """
+    if s in COLORS:
+        return text.replace(s, COLORS[s] + s + RESET)
+    return text
+
+
+def cell_width(board_size):
+    """ Width of the text boxes, to hold the largest position number
+    """
+    return max(3, len(str(board_size ** 2)))
+
+
+def board_margin(board_size):
+    """ Num of spaces before each line of a board
+    """
+    return max([1, 8-board_size//4-board_size//6])
+
+
+def show_cells(board_size, users_hist):
+    """ Text of each cell: 'X', 'O', or the position number if empty
+    """
+    show_list = [str(i) for i in range(1, 1 + board_size ** 2)]
+    for y in users_hist[0]:
+        show_list[y-1] = 'X'
+    for y in users_hist[1]:
+        show_list[y-1] = 'O'
+    return show_list
+
+
+def frame_lines(board_size, show_list, color=False):
+    """ Box-drawing lines of a play board
+    Input:
+        board_size: int, grid size n of a play board nxn
+        show_list: list, text of each cell
+        color: bool, wrap 'X' and 'O' in their font colors
+    Output:
+        boxdraw: list, line strings without the margin
+    """
+    w = cell_width(board_size)
+    bar = '─' * w
+    boxdraw = ['┌' + bar + ('┬' + bar) * (board_size - 1) + '┐']
+    for i in range(board_size):
+        row = [f'{s: ^{w}}' for s in
+               show_list[i*board_size:(i+1)*board_size]]
+        if color:
+            row = [color_cell(text, s) for text, s in
+                   zip(row, show_list[i*board_size:(i+1)*board_size])]
+        boxdraw.append('│' + '│'.join(row) + '│')
+        boxdraw.append('├' + bar + ('┼' + bar) * (board_size - 1) + '┤')
+    boxdraw[-1] = '└' + bar + ('┴' + bar) * (board_size - 1) + '┘'
+    return boxdraw
+
+
+def terminal_lines():
+    """ Num of lines of the terminal
+    """
+    import shutil     ## slow to import, only needed on terminals
+    return shutil.get_terminal_size().lines
+
+
+def ansi_supported(stream):
+    """ Check if <stream> is a terminal taking ANSI cursor addressing
+    """
+    if os.environ.get('TICTACTOE_ANSI') is not None:
+        return os.environ['TICTACTOE_ANSI'] == '1'
+    return hasattr(stream, 'isatty') and stream.isatty() \
+        and os.name != 'nt' and os.environ.get('TERM', 'dumb') != 'dumb'
+
+
+class BoardRenderer:
+    """ Drawing of one play board in a terminal, kept up to date with the
+        game: on an ANSI terminal the board is drawn once at the top of the
+        screen, the lines below scroll under it, and each move rewrites
+        only the cells that changed; otherwise the whole board is printed
+        again when it changes (as display() does)
+    Input:
+        board_size: int, grid size n of a play board nxn
+        stream: file, output terminal, sys.stdout by default
+        ansi: bool, use ANSI cursor addressing, detected if None
+    """
+
+    def __init__(self, board_size, stream=None, ansi=None):
+        self.board_size = board_size
+        self.stream = sys.stdout if stream is None else stream
+        if ansi is None:
+            ansi = ansi_supported(self.stream)
+        ## board lines and a few below must fit in the terminal
+        n_lines = 2 * board_size + 1
+        if ansi and n_lines + 4 > terminal_lines():
+            ansi = False
+        self.ansi = ansi
+        self.cells = None          ## text of the cells as drawn
+        self.scrolling = False     ## scroll region set below the board
+        if ansi:
+            atexit.register(self.close)
+
+    @timed('render')
+    def draw(self, users_hist):
+        """ Draw the whole board
+        """
+        self._draw(users_hist)
+
+    def _draw(self, users_hist):
+        n = self.board_size
+        self.cells = show_cells(n, users_hist)
+        margin = ' ' * board_margin(n)
+        out = []
+        if self.ansi:
+            ## board at the top, the scroll region below it
+            rows = terminal_lines()
+            out.append('\033[r\033[H\033[2J')
+            self.scrolling = True
+        for line in frame_lines(n, self.cells, color=True):
+            out.append(margin + line + '\n')
+        if self.ansi:
+            out.append(f'\033[{2 * n + 2};{rows}r\033[{2 * n + 2};1H')
+        self.stream.write(''.join(out))
+        self.stream.flush()
+
+    @timed('render')
+    def update(self, users_hist):
+        """ Show the board after new moves in <users_hist>, rewriting only
+            the changed cells if possible
+        """
+        n = self.board_size
+        cells = show_cells(n, users_hist)
+        if self.cells is None or not self.ansi:
+            if cells != self.cells:
+                self._draw(users_hist)
+            return
+        w = cell_width(n)
+        col_0 = board_margin(n) + 2
+        out = ['\0337']                          ## save cursor
+        for k, s in enumerate(cells):
+            if s != self.cells[k]:
+                i, j = divmod(k, n)
+                out.append(f'\033[{2 * i + 2};{col_0 + j * (w + 1)}H'
+                           + color_cell(f'{s: ^{w}}', s))
+        out.append('\0338')                      ## restore cursor
+        if len(out) > 2:
+            self.stream.write(''.join(out))
+            self.stream.flush()
+        self.cells = cells
+
+    def close(self):
+        """ Give the whole screen back to scrolling text
+        """
+        if self.scrolling:
+            self.stream.write('\033[r')
+            rows = terminal_lines()
+            self.stream.write(f'\033[{rows};1H\n')
+            self.stream.flush()
+            self.scrolling = False
@@ -0,0 +1,343 @@
+"""
+Tic-Tac-Toe Game Server (headless games against the bot for many clients at
+once, over a line protocol on TCP or a Unix socket, with a load generator)
+
+Each connection is a session with its own board. Commands and replies are
+lines of text, one reply per command:
+    NEW <n> [<k> [<level> [user|bot]]]   new game on nxn grid, k in a row
+                                         to win, bot smart level, and who
+                                         plays first (user by default)
+    PLAY <pos>                           user's move
+    SHOW                                 positions of both players
+    QUIT                                 end of the session
+    OK <bot_pos> <status>                after NEW and PLAY: the bot's move
+                                         ('-' if none) and the win status
+                                         (0: going on, 1/2: player won,
+                                         -1: draw)
+    BOARD <X positions> <O positions>    after SHOW, comma separated
+    ERR <message>                        command not accepted
+    BYE                                  after QUIT
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import asyncio
+import random
+import signal
+import time
+
+from tictactoe_engine import new_game
+from tictactoe_with_bot import get_input_from_bot
+
+HOST = '127.0.0.1'
+PORT = 8765
+MAX_BOARD_SIZE = 50
+
+
+def bot_move(board_size, win_len, users_hist, bot_level, seed, board=None):
+    """ Position of the bot, run in an executor of the server
+    Input:
+        board_size: int, grid size n of a play board nxn
+        win_len: int, k positions in a row to win
+        users_hist: list, users' position history
+        bot_level: float, smart level of bot
+        seed: int, seed of the random choices of the move
+        board: BoardState, state of the game, rebuilt from <users_hist>
+            if None (in worker processes)
+    Output:
+        pos_chosen: int, position chosen for the bot
+    """
+    if board is None:
+        board = new_game(board_size, users_hist, win_len)
+    return get_input_from_bot(board.users_hist, board.available_pos,
+                              board.line_sets, board_size, bot_level,
+                              random.Random(seed), board=board)
+
+
+class GameServer:
+    """ Server of games against the bot, one session per connection
+        The event loop only reads, checks and writes; bot moves run in an
+        executor, threads by default, so that a slow move on a large board
+        holds up its own session only.
+    Input:
+        processes: int, worker processes for bot moves, threads if 0
+        threads: int, threads for bot moves, if no processes
+        seed: int, seed of the sessions' random generators, or None
+    Attributes:
+        n_sessions: int, sessions started
+        n_active: int, sessions connected
+        n_moves: int, bot moves made
+    """
+
+    def __init__(self, processes=0, threads=None, seed=None):
+        if processes > 0:
+            from concurrent.futures import ProcessPoolExecutor
+            ## Ctrl-C stops the server, which then stops the workers
+            self.executor = ProcessPoolExecutor(
+                processes, initializer=signal.signal,
+                initargs=(signal.SIGINT, signal.SIG_IGN))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(threads)
+        self.in_process = processes <= 0
+        self.rng = random.Random(seed)
+        self.n_sessions = 0
+        self.n_active = 0
+        self.n_moves = 0
+
+    async def _bot_reply(self, session):
+        """ Bot's move if it is the bot's turn, as a reply
+        """
+        board = session['board']
+        pos = '-'
+        if board.status == 0 and len(board.moves) & 1 == session['bot']:
+            seed = session['rng'].getrandbits(64)
+            args = (board.board_size, board.win_len, board.users_hist,
+                    session['level'], seed)
+            if self.in_process:
+                args += (board,)
+            pos = await asyncio.get_running_loop().run_in_executor(
+                self.executor, bot_move, *args)
+            board.make(pos)
+            self.n_moves += 1
+        return f'OK {pos} {board.status}'
+
+    async def _command(self, session, words):
+        """ Reply to one command line, split in <words>
+        """
+        cmd = words[0].upper()
+        board = session['board']
+        if cmd == 'NEW':
+            if not 2 <= len(words) <= 5 \
+                    or not all(w.isdigit() for w in words[1:3]):
+                return 'ERR usage: NEW <n> [<k> [<level> [user|bot]]]'
+            n = int(words[1])
+            k = int(words[2]) if len(words) > 2 else n
+            if not 3 <= n <= MAX_BOARD_SIZE or not 3 <= k <= n:
+                return f'ERR board size not in [3,{MAX_BOARD_SIZE}] ' \
+                       'or winning length not in [3,n]'
+            try:
+                level = float(words[3]) if len(words) > 3 else 0.5
+            except ValueError:
+                level = -1.0
+            if not 0 <= level <= 1:
+                return 'ERR bot level not in [0,1]'
+            first = words[4].lower() if len(words) > 4 else 'user'
+            if first not in ('user', 'bot'):
+                return "ERR first player not 'user' or 'bot'"
+            session['board'] = new_game(n, None, k)
+            session['level'] = level
+            session['bot'] = 0 if first == 'bot' else 1
+            return await self._bot_reply(session)
+        if cmd == 'PLAY':
+            if board is None:
+                return 'ERR no game, start one with NEW'
+            if board.status != 0:
+                return 'ERR game already stopped'
+            if len(words) != 2 or not words[1].isdigit():
+                return 'ERR usage: PLAY <pos>'
+            pos = int(words[1])
+            if not 1 <= pos <= board.board_size ** 2 \
+                    or (board.bits[0] | board.bits[1]) >> pos & 1:
+                return 'ERR position not available'
+            board.make(pos)
+            return await self._bot_reply(session)
+        if cmd == 'SHOW':
+            if board is None:
+                return 'ERR no game, start one with NEW'
+            return 'BOARD ' + ' '.join(
+                ','.join(map(str, h)) if len(h) > 0 else '-'
+                for h in board.users_hist)
+        return f'ERR unknown command {words[0]!r}'
+
+    async def handle(self, reader, writer):
+        """ Session of one connection
+        """
+        self.n_sessions += 1
+        self.n_active += 1
+        session = {'board': None, 'level': 0.5, 'bot': 1,
+                   'rng': random.Random(self.rng.getrandbits(64))}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode('ascii', 'replace').split()
+                if len(words) == 0:
+                    continue
+                if words[0].upper() == 'QUIT':
+                    writer.write(b'BYE\n')
+                    await writer.drain()
+                    break
+                reply = await self._command(session, words)
+                writer.write(reply.encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError,
+                asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.n_active -= 1
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT, path=None):
+        """ Start listening on TCP <host>:<port>, or Unix socket <path>
+        Output:
+            server: asyncio.AbstractServer, the listening server
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port,
+                                          backlog=1024)
+
+    async def serve(self, host=HOST, port=PORT, path=None):
+        """ Serve sessions until cancelled
+        """
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+async def _open(host, port, path):
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+async def load_session(host, port, path, board_size, win_len, bot_level,
+                       rng, latencies):
+    """ One session of the load generator: a game of random user moves
+        against the bot, with the latency of each move appended to
+        <latencies>
+    Output:
+        status: int, final win status
+    """
+    reader, writer = await _open(host, port, path)
+    first = 'user' if rng.random() < 0.5 else 'bot'
+    available = set(range(1, board_size ** 2 + 1))
+    command = f'NEW {board_size} {win_len} {bot_level} {first}'
+    try:
+        while True:
+            t0 = time.perf_counter()
+            writer.write(command.encode() + b'\n')
+            await writer.drain()
+            reply = (await reader.readline()).decode().split()
+            latencies.append(time.perf_counter() - t0)
+            if len(reply) != 3 or reply[0] != 'OK':
+                raise ValueError(
+                    f'load_session(): unexpected reply {reply!r}')
+            if reply[1] != '-':
+                available.discard(int(reply[1]))
+            status = int(reply[2])
+            if status != 0:
+                break
+            pos = rng.choice(sorted(available))
+            available.discard(pos)
+            command = f'PLAY {pos}'
+        writer.write(b'QUIT\n')
+        await writer.drain()
+        await reader.readline()
+    finally:
+        writer.close()
+    return status
+
+
+def _percentile(values, q):
+    """ q-th percentile of sorted <values>, by the nearest rank
+    """
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def run_load(n_sessions=1000, concurrency=100, board_size=3,
+                   win_len=None, bot_level=0.5, host=HOST, port=PORT,
+                   path=None, seed=None):
+    """ Load generator: <n_sessions> games against a running server, with
+        <concurrency> of them at a time
+    Input:
+        n_sessions: int, num of sessions (games) to play
+        concurrency: int, num of sessions connected at a time
+        board_size: int, grid size n of a play board nxn
+        win_len: int, k positions in a row to win, n if None
+        bot_level: float, smart level of the bot
+        host, port, path: address of the server, Unix socket if <path>
+        seed: int, seed of the random user moves, or None
+    Output:
+        stats: dict, sessions/sec, moves/sec, latency percentiles of the
+            moves in milliseconds, and final status counts
+    """
+    win_len = win_len or board_size
+    rng = random.Random(seed)
+    latencies = []
+    status = {1: 0, 2: 0, -1: 0}
+    todo = iter(range(n_sessions))
+
+    async def client():
+        for _ in todo:
+            s = await load_session(host, port, path, board_size, win_len,
+                                   bot_level, random.Random(
+                                       rng.getrandbits(64)), latencies)
+            status[s] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    seconds = time.perf_counter() - t0
+    latencies.sort()
+    stats = {'sessions': n_sessions, 'seconds': round(seconds, 3),
+             'sessions_per_sec': round(n_sessions / seconds, 1),
+             'moves_per_sec': round(len(latencies) / seconds, 1)}
+    for q in (50, 90, 99, 100):
+        stats[f'p{q}_ms'] = round(1000 * _percentile(latencies, q), 3)
+    stats.update({'x_wins': status[1], 'o_wins': status[2],
+                  'draws': status[-1]})
+    return stats
+
+
+def main_server(argv=None):
+    """ Command line entry: serve games, or generate load on a server
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Tic-tac-toe game server and its load generator')
+    parser.add_argument('mode', choices=['serve', 'load'])
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', metavar='PATH',
+                        help='Unix socket instead of TCP')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='worker processes for bot moves (serve), '
+                             'threads if 0')
+    parser.add_argument('--sessions', type=int, default=1000,
+                        help='sessions to play (load)')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='sessions at a time (load)')
+    parser.add_argument('--size', type=int, default=3,
+                        help='board size (load)')
+    parser.add_argument('--win-len', type=int, help='k in a row (load)')
+    parser.add_argument('--level', type=float, default=0.5,
+                        help='bot smart level (load)')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+    if args.mode == 'serve':
+        server = GameServer(args.processes, seed=args.seed)
+        where = args.unix or f'{args.host}:{args.port}'
+        print(f'serving tic-tac-toe games on {where}')
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+        print(f'{server.n_sessions} sessions, {server.n_moves} bot moves')
+    else:
+        stats = asyncio.run(run_load(
+            args.sessions, args.concurrency, args.size, args.win_len,
+            args.level, args.host, args.port, args.unix, args.seed))
+        for key, value in stats.items():
+            print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main_server()
@@ -0,0 +1,267 @@
+"""
+Tic-Tac-Toe Solver (negamax search with alpha-beta pruning, transposition
+table and board symmetries)
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import random
+import time
+
+from tictactoe_book import get_book
+from tictactoe_engine import BoardState, init_game, symmetry_tables
+
+WIN = 10 ** 9                  ## value of a won game, above any evaluation
+EXACT, LOWER, UPPER = 0, 1, 2  ## kinds of values in the transposition table
+
+
+class SearchTimeout(Exception):
+    """ Raised inside a search when its time budget runs out
+    """
+
+
+class Solver:
+    """ Perfect-play (or depth-limited) search of tic-tac-toe positions
+        Positions are keyed by a Zobrist hash reduced over the 8 board
+        symmetries, so that symmetric positions share one table entry.
+    Input:
+        board_size: int, grid size n of a play board nxn
+        max_entries: int, transposition table is cleared beyond this size
+        seed: int, seed of the Zobrist keys
+        win_len: int, k positions in a row to win, n if None
+    """
+
+    def __init__(self, board_size, max_entries=2000000, seed=0, win_len=None):
+        self.board_size = board_size
+        self.board = BoardState(board_size,
+                                init_game(board_size, None, win_len)[1])
+        self.max_entries = max_entries
+        self.table = {}
+        self.syms, self.inv_syms, self.sym_keys = symmetry_tables(
+            board_size, seed)
+        self.hashes = [0] * len(self.syms)
+        self.nodes = 0
+        self.deadline = None
+
+    def best_move(self, users_hist, time_limit=None, max_depth=None):
+        """ Best position for the player in turn
+        Input:
+            users_hist: list, users' position history
+            time_limit: float, seconds for the search, None for no limit
+            max_depth: int, max plies to search, None for the end of game
+        Output:
+            pos: int, chosen position
+            value: int, WIN/-WIN if the game is solved as won/lost for the
+                   player in turn, 0 for a draw, otherwise an evaluation
+            depth: int, plies fully searched
+        """
+        board = self.board
+        board.reset()
+        self.hashes = [0] * len(self.syms)
+        for i in range(len(users_hist[0])):
+            self._make(users_hist[0][i])
+            if i < len(users_hist[1]):
+                self._make(users_hist[1][i])
+        if board.status != 0 or len(board.available_pos) == 0:
+            raise ValueError('Solver.best_move(): game already stopped')
+        self.deadline = None if time_limit is None \
+            else time.perf_counter() + time_limit
+        self.nodes = 0
+        n_left = len(board.available_pos)
+        if max_depth is None or max_depth > n_left:
+            max_depth = n_left
+        ## an immediate win needs no search
+        player = len(board.moves) & 1
+        for pos in board.available_pos:
+            if self._wins(pos, player):
+                return pos, WIN, 1
+        result = (self._ordered_moves(None)[0], 0, 0)
+        ## iterative deepening only pays off with a time budget
+        depths = range(1, max_depth + 1) if self.deadline is not None \
+            else [max_depth]
+        for depth in depths:
+            try:
+                pos, value = self._search_root(depth)
+            except SearchTimeout:
+                break
+            result = (pos, value, depth)
+            if abs(value) == WIN:
+                break
+        ## unwind a search stopped in the middle
+        while len(board.moves) > len(users_hist[0]) + len(users_hist[1]):
+            self._unmake()
+        return result
+
+    def _wins(self, pos, player):
+        counts = self.board.line_counts[player]
+        line_len = self.board.line_len
+        return any(counts[i] + 1 == line_len[i]
+                   for i in self.board.cell_lines[pos])
+
+    def _make(self, pos):
+        player = len(self.board.moves) & 1
+        keys = self.sym_keys[player][pos]
+        self.hashes = [h ^ k for h, k in zip(self.hashes, keys)]
+        self.board.make(pos)
+
+    def _unmake(self):
+        pos = self.board.unmake()
+        keys = self.sym_keys[len(self.board.moves) & 1][pos]
+        self.hashes = [h ^ k for h, k in zip(self.hashes, keys)]
+
+    def _canonical(self):
+        """ Key of the position reduced over symmetries, and the symmetry
+        """
+        key = min(self.hashes)
+        return key, self.hashes.index(key)
+
+    def _ordered_moves(self, tt_move):
+        """ Available positions, most threatening first (as the bot does,
+            positions on lines closer to completion go first)
+        """
+        board = self.board
+        player = len(board.moves) & 1
+        mine = board.line_counts[player]
+        other = board.line_counts[1 - player]
+        score = {}
+        for pos in board.available_pos:
+            s = 0
+            for i in board.cell_lines[pos]:
+                if other[i] == 0:
+                    s += 4 << (2 * mine[i])      ## own lines weigh more
+                if mine[i] == 0:
+                    s += 3 << (2 * other[i])
+            score[pos] = s
+        moves = sorted(board.available_pos, key=score.__getitem__,
+                       reverse=True)
+        if tt_move is not None:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        return moves
+
+    def _evaluate(self):
+        """ Evaluation for the player in turn at the depth limit
+        """
+        board = self.board
+        player = len(board.moves) & 1
+        mine = board.line_counts[player]
+        other = board.line_counts[1 - player]
+        value = 0
+        for i in range(len(mine)):
+            if other[i] == 0:
+                value += mine[i] * mine[i]
+            elif mine[i] == 0:
+                value -= other[i] * other[i]
+        return value
+
+    def _search_root(self, depth):
+        best_pos, alpha = None, -WIN - 1
+        key, sym = self._canonical()
+        entry = self.table.get(key)
+        tt_move = None if entry is None else self.inv_syms[sym][entry[3]]
+        for pos in self._ordered_moves(tt_move):
+            self._make(pos)
+            value = -self._negamax(depth - 1, -WIN - 1, -alpha)
+            self._unmake()
+            if value > alpha:
+                best_pos, alpha = pos, value
+        self._store(key, sym, depth, alpha, EXACT, best_pos)
+        return best_pos, alpha
+
+    def _negamax(self, depth, alpha, beta):
+        board = self.board
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0 \
+           and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if board.status != 0:
+            ## the last move either won the game or left no line to win
+            return 0 if board.status == -1 else -WIN
+        if depth == 0:
+            return self._evaluate()
+        player = len(board.moves) & 1
+        ## a player who cannot complete any line can do no better than draw
+        if board.n_open[player] == 0:
+            beta = min(beta, 0)
+        if board.n_open[1 - player] == 0:
+            alpha = max(alpha, 0)
+        if alpha >= beta:
+            return alpha
+        key, sym = self._canonical()
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_value, e_flag, e_move = entry
+            tt_move = self.inv_syms[sym][e_move]
+            if e_depth >= depth or abs(e_value) == WIN:
+                if e_flag == EXACT:
+                    return e_value
+                elif e_flag == LOWER:
+                    alpha = max(alpha, e_value)
+                else:
+                    beta = min(beta, e_value)
+                if alpha >= beta:
+                    return e_value
+        alpha_0 = alpha
+        best_value, best_pos = -WIN - 1, None
+        for pos in self._ordered_moves(tt_move):
+            self._make(pos)
+            value = -self._negamax(depth - 1, -beta, -alpha)
+            self._unmake()
+            if value > best_value:
+                best_value, best_pos = value, pos
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        if best_value <= alpha_0:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, sym, depth, best_value, flag, best_pos)
+        return best_value
+
+    def _store(self, key, sym, depth, value, flag, pos):
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        self.table[key] = (depth, value, flag, self.syms[sym][pos])
+
+
+_solvers = {}   ## Solver per (board size, winning length), keeping its
+                ## table between moves
+
+
+def get_input_from_solver(users_hist, available_pos, win_lines,
+                          board_size, bot_level=1.0, rng=random, board=None,
+                          time_limit=1.0):
+    """ Get a position from the perfect-play bot (same inputs as
+        get_input_from_bot()): positions in the opening book are looked up,
+        other 3x3 and 4x4 games are solved exactly, and larger ones
+        searched as deep as <time_limit> seconds allow
+    Input:
+        users_hist: list, users' position history
+        available_pos: list, available positions on play board
+        win_lines: list of sets, collection of winning conditions (unused)
+        board_size: int, grid size n of a play board nxn
+        bot_level: float, smart level of bot (unused, always full power)
+        rng: random.Random, random generator (unused, search is exact)
+        board: BoardState, state of the same game, for its winning length
+        time_limit: float, seconds for a search on boards larger than 4x4
+    Output:
+        pos_chosen: int, position chosen for the bot
+    """
+    win_len = board_size if board is None else board.win_len
+    if board_size <= 4 and win_len == board_size:
+        book = get_book(board_size)
+        found = None if book is None else book.lookup(users_hist)
+        if found is not None:
+            return found[0]
+    if (board_size, win_len) not in _solvers:
+        _solvers[(board_size, win_len)] = Solver(board_size, win_len=win_len)
+    if board_size <= 4:
+        time_limit = None
+    return _solvers[(board_size, win_len)].best_move(users_hist,
+                                                     time_limit)[0]
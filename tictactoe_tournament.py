@@ -0,0 +1,329 @@
+"""
+Tic-Tac-Toe Tournament (round-robin matches of bot strategies on several
+boards, resumable, with Elo ratings from a Bradley-Terry model)
+
+Each match of two entrants on a board is played in chunks of games, half
+of them with each entrant first. Every chunk has its own seed, made from
+the tournament seed and the chunk's key, and its result is appended to a
+JSON-lines file as soon as it is played: a run stopped for any reason
+goes on from there when started again with the same file and setup.
+
+MIT license
+Copyright (c) 2024 ddotplus@github
+"""
+
+import json
+import math
+import os
+import random
+from collections import namedtuple
+
+from tictactoe_with_bot import bot_vs_bot_counts, get_input_from_bot
+
+Entrant = namedtuple('Entrant', ['name', 'bot_input', 'bot_level'])
+
+
+def heuristic(bot_level):
+    """ Entrant of the heuristic bot at a smart level
+    """
+    return Entrant(f'bot-{bot_level}', get_input_from_bot, bot_level)
+
+
+def tournament_jobs(entrants, boards, n_games, chunk, seed):
+    """ Chunks of games of a tournament, in a fixed order
+    Input:
+        entrants: list, Entrant of each strategy
+        boards: list, (board_size, win_len) of each board
+        n_games: int, games per pair of entrants on each board, half
+            with each of them first
+        chunk: int, max games per chunk
+        seed: int, seed of the tournament
+    Output:
+        jobs: list, (key, board_size, win_len, first, second, games, seed),
+            the key naming the tournament's seed, games and chunk too, so
+            that a tournament of another setup does not take its chunks
+    """
+    jobs = []
+    for board_size, win_len in boards:
+        for i, a in enumerate(entrants):
+            for b in entrants[i+1:]:
+                for k, (first, second) in enumerate(((a, b), (b, a))):
+                    n_pair = n_games // 2 + (k < n_games % 2)
+                    for c in range(-(-n_pair // chunk)):
+                        key = f'{seed}/{n_games}/{chunk}|' \
+                              f'{board_size}/{win_len}:{first.name}' \
+                              f'|{second.name}#{c}'
+                        games = min(chunk, n_pair - c * chunk)
+                        s = random.Random(f'{seed}:{key}').getrandbits(64)
+                        jobs.append((key, board_size, win_len, first,
+                                     second, games, s))
+    return jobs
+
+
+def play_chunk(key, board_size, win_len, first, second, games, seed):
+    """ Play a chunk of games of tournament_jobs()
+    Output:
+        result: dict, the chunk and the wins of both entrants and draws
+    """
+    counts = bot_vs_bot_counts(board_size, first.bot_level,
+                               second.bot_level, games, seed,
+                               win_len=win_len,
+                               bot_inputs=(first.bot_input, second.bot_input))
+    return {'key': key, 'board_size': board_size, 'win_len': win_len,
+            'first': first.name, 'second': second.name, 'games': games,
+            'seed': seed, 'first_wins': counts[0], 'second_wins': counts[1],
+            'draws': counts[2]}
+
+
+def load_results(path):
+    """ Results of the chunks played so far, from a JSON-lines file
+        (a last line cut short by a crash is left out)
+    """
+    results = []
+    if path is None or not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            if line.endswith('\n') and len(line.strip()) > 0:
+                results.append(json.loads(line))
+    return results
+
+
+def run_tournament(entrants, boards=((3, 3),), n_games=1000, workers=1,
+                   seed=0, path=None, chunk=250, verbose=False):
+    """ Round-robin tournament of bot strategies
+    Input:
+        entrants: list, Entrant of each strategy, with picklable bot_input
+            if <workers> > 1 (module functions, partial, LearnedInput...)
+        boards: list, (board_size, win_len) of each board
+        n_games: int, games per pair of entrants on each board
+        workers: int, number of processes playing chunks, 1 for no pool
+        seed: int, seed of the tournament
+        path: str, JSON-lines file of the results, appended to as chunks
+            are played, and whose chunks of the same tournament (entrants,
+            boards, n_games, chunk and seed) are not played again
+        chunk: int, max games per chunk
+        verbose: bool, print the progress
+    Output:
+        results: list, result of each chunk of this tournament
+    """
+    names = [e.name for e in entrants]
+    if len(set(names)) != len(names):
+        raise ValueError('run_tournament(): <entrants> names not unique')
+    jobs = tournament_jobs(entrants, boards, n_games, chunk, seed)
+    done = {r['key']: r for r in load_results(path)}
+    for key, *_, games, s in jobs:
+        if key in done and (done[key]['games'], done[key]['seed']) \
+                != (games, s):
+            raise ValueError(f'run_tournament(): <path> chunk {key!r} '
+                             'played with other games or seed')
+    results = [done[job[0]] for job in jobs if job[0] in done]
+    todo = [job for job in jobs if job[0] not in done]
+    if verbose and len(results) > 0:
+        print(f'resuming: {len(results)} of {len(jobs)} chunks played')
+    out = None
+    if path is not None:
+        if os.path.exists(path):
+            ## cut off a last line left short, to append after it
+            with open(path, 'rb+') as f:
+                f.truncate(f.read().rfind(b'\n') + 1)
+        out = open(path, 'a')
+
+    def save(result):
+        results.append(result)
+        if out is not None:
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            os.fsync(out.fileno())
+        if verbose:
+            print('{} of {} chunks, {}: {}-{}-{}'.format(
+                len(results), len(jobs), result['key'],
+                result['first_wins'], result['second_wins'],
+                result['draws']))
+
+    try:
+        if workers <= 1:
+            for job in todo:
+                save(play_chunk(*job))
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            error = None
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(play_chunk, *job) for job in todo]
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    if future.exception() is not None:
+                        if error is None:
+                            ## chunks not started are dropped, the running
+                            ## ones are still saved (no cancel_futures in
+                            ## Python 3.8)
+                            error = future.exception()
+                            for f in futures:
+                                f.cancel()
+                        continue
+                    save(future.result())
+            if error is not None:
+                raise error
+    finally:
+        if out is not None:
+            out.close()
+    return results
+
+
+def _invert(a):
+    """ Inverse of a small square matrix (list of lists), Gauss-Jordan
+    """
+    n = len(a)
+    m = [row[:] + [float(i == j) for j in range(n)]
+         for i, row in enumerate(a)]
+    for c in range(n):
+        p = max(range(c, n), key=lambda r: abs(m[r][c]))
+        m[c], m[p] = m[p], m[c]
+        pivot = m[c][c]
+        m[c] = [x / pivot for x in m[c]]
+        for r in range(n):
+            if r != c and m[r][c] != 0:
+                f = m[r][c]
+                m[r] = [x - f * y for x, y in zip(m[r], m[c])]
+    return [row[n:] for row in m]
+
+
+def bradley_terry(results, names=None, prior=1.0, iters=1000, tol=1e-9):
+    """ Elo ratings of the entrants, fitted to a Bradley-Terry model of the
+        results with draws counted as half a win for each side
+    Input:
+        results: list, chunk results of run_tournament()
+        names: list, entrants to rate, all those in <results> if None
+        prior: float, virtual drawn games between every two entrants, so
+            that an entrant without wins or losses has a finite rating
+        iters: int, max iterations of the minorization-maximization fit
+        tol: float, stop once no log-strength moves more than this
+    Output:
+        ratings: dict, name -> (elo, half width of the 95% confidence
+            interval), on the Elo scale with 1500 as the mean
+    """
+    if names is None:
+        names = sorted({r['first'] for r in results}
+                       | {r['second'] for r in results})
+    idx = {name: i for i, name in enumerate(names)}
+    m = len(names)
+    games = [[prior] * m for _ in range(m)]     ## games between i and j
+    wins = [prior / 2 * (m - 1)] * m            ## wins of i, draws half
+    for i in range(m):
+        games[i][i] = 0.0
+    for r in results:
+        if r['first'] not in idx or r['second'] not in idx:
+            continue
+        a, b = idx[r['first']], idx[r['second']]
+        games[a][b] += r['games']
+        games[b][a] += r['games']
+        wins[a] += r['first_wins'] + r['draws'] / 2
+        wins[b] += r['second_wins'] + r['draws'] / 2
+    ## minorization-maximization (Hunter, 2004) of strengths gamma
+    gamma = [1.0] * m
+    for _ in range(iters):
+        new = [wins[i] / sum(games[i][j] / (gamma[i] + gamma[j])
+                             for j in range(m) if j != i)
+               if m > 1 else 1.0 for i in range(m)]
+        mean_log = sum(math.log(g) for g in new) / m
+        new = [g / math.exp(mean_log) for g in new]
+        moved = max(abs(math.log(g / h)) for g, h in zip(new, gamma))
+        gamma = new
+        if moved < tol:
+            break
+    theta = [math.log(g) for g in gamma]
+    ## covariance of the log-strengths from the Fisher information, with
+    ## theta[0] held fixed, then moved to the mean as the reference
+    cov = [[0.0] * m for _ in range(m)]
+    if m > 1:
+        info = [[0.0] * m for _ in range(m)]
+        for i in range(m):
+            for j in range(m):
+                if i != j:
+                    p = gamma[i] / (gamma[i] + gamma[j])
+                    v = games[i][j] * p * (1 - p)
+                    info[i][i] += v
+                    info[i][j] -= v
+        sub = _invert([row[1:] for row in info[1:]])
+        for i in range(1, m):
+            for j in range(1, m):
+                cov[i][j] = sub[i-1][j-1]
+        row_mean = [sum(row) / m for row in cov]
+        all_mean = sum(row_mean) / m
+        cov = [[cov[i][j] - row_mean[i] - row_mean[j] + all_mean
+                for j in range(m)] for i in range(m)]
+    scale = 400 / math.log(10)
+    return {name: (1500 + scale * theta[i],
+                   1.96 * scale * math.sqrt(max(0.0, cov[i][i])))
+            for name, i in idx.items()}
+
+
+def tournament_report(results, names=None):
+    """ Ratings over all boards and on each board, as text
+    """
+    boards = sorted({(r['board_size'], r['win_len']) for r in results})
+    lines = []
+    for title, subset in [('all boards', results)] + [
+            (f'{n}x{n}, {k} in a row', [r for r in results
+                                         if (r['board_size'],
+                                             r['win_len']) == (n, k)])
+            for n, k in boards]:
+        n_games = sum(r['games'] for r in subset)
+        lines.append(f'## {title} ({n_games} games)')
+        ratings = bradley_terry(subset, names)
+        for name, (elo, ci) in sorted(ratings.items(),
+                                      key=lambda x: -x[1][0]):
+            lines.append(f'{name:>16}: {elo:7.1f} +/- {ci:5.1f}')
+    return '\n'.join(lines)
+
+
+def main_tournament(argv=None):
+    """ Command line entry: tournament of heuristic bots at some levels,
+        and optionally the learned, MCTS and perfect-play bots
+    """
+    import argparse
+    from functools import partial
+    parser = argparse.ArgumentParser(
+        description='Round-robin tournament of tic-tac-toe bots')
+    parser.add_argument('--levels', type=float, nargs='+',
+                        default=[0.0, 0.5, 1.0],
+                        help='smart levels of heuristic bots')
+    parser.add_argument('--bots', nargs='*', default=[],
+                        choices=['learned', 'mcts', 'solver'],
+                        help='other bots to enter')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3])
+    parser.add_argument('--win-len', type=int,
+                        help='k in a row to win, n if not given')
+    parser.add_argument('--games', type=int, default=1000,
+                        help='games per pair of bots on each board')
+    parser.add_argument('--chunk', type=int, default=250)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', metavar='FILE',
+                        help='JSON-lines file of results, to resume from')
+    args = parser.parse_args(argv)
+    entrants = [heuristic(level) for level in args.levels]
+    if 'learned' in args.bots:
+        from tictactoe_learned import LearnedInput
+        entrants.append(Entrant('learned', LearnedInput(), 1.0))
+    if 'mcts' in args.bots:
+        from tictactoe_mcts import get_input_from_mcts
+        ## a playout budget, not a time limit, so that runs are the same
+        entrants.append(Entrant('mcts', partial(get_input_from_mcts,
+                                                time_limit=None,
+                                                max_playouts=500), 0.5))
+    if 'solver' in args.bots:
+        from tictactoe_solver import get_input_from_solver
+        entrants.append(Entrant('solver', partial(get_input_from_solver,
+                                                  time_limit=0.05), 1.0))
+    boards = [(n, n if args.win_len is None else min(n, args.win_len))
+              for n in args.sizes]
+    results = run_tournament(entrants, boards, args.games, args.workers,
+                             args.seed, args.out, args.chunk, verbose=True)
+    print(tournament_report(results, [e.name for e in entrants]))
+    return results
+
+
+if __name__ == '__main__':
+    main_tournament()
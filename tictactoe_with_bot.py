@@ -5,9 +5,15 @@ MIT license
 Copyright (c) 2024 ddotplus@github
 """
 
-from tictactoe_2players import *
-from time import sleep
+from tictactoe_2players import BoardRenderer, get_input, hist_input, \
+    show_win_status, win_len_input
+from tictactoe_engine import BoardState, WinWindows, init_game, new_game, \
+    play_game
+from collections import Counter
+from time import perf_counter, sleep
+import os
 import random
+import tictactoe_profile
 
 
 def find_win_pos_best(user_hist, available_pos, win_lines, N=1):
@@ -15,7 +21,7 @@ def find_win_pos_best(user_hist, available_pos, win_lines, N=1):
     Input:
         user_hist: list, position history for a given user
         available_pos: list, available positions on play board
-        win_lines: list of sets, collection of winning conditions
+        win_lines: list of sets or WinWindows, winning conditions
         N: int, num of positions to fill before satisfy a winning line
     Output:
         win_pos_best: list, most frequent winning positions
@@ -24,69 +30,123 @@ def find_win_pos_best(user_hist, available_pos, win_lines, N=1):
     if len(user_hist) == 0:    ## don't do anything for totally new game
         return win_pos
     else:
+        if isinstance(win_lines, WinWindows):
+            win_lines = map(set, win_lines)   ## one window set at a time
+        user_set = set(user_hist)
+        available_set = set(available_pos)
         for wl in win_lines:
-            missing_pos = list(wl - set(user_hist))
-            missing_not_available = set(missing_pos)-set(available_pos)
-            if (len(missing_pos) == N) and (len(missing_not_available) == 0):
-                win_pos = win_pos + missing_pos
+            missing_pos = wl - user_set
+            if (len(missing_pos) == N) and missing_pos <= available_set:
+                win_pos.extend(missing_pos)
     if len(win_pos) == 0:
         return win_pos
     elif len(set(win_pos)) == 1:
         return list(set(win_pos))
     ## 2+ distinct positions in win_pos, find best one(s)
-    win_pos_dict = {k: win_pos.count(k) for k in set(win_pos)}
+    win_pos_dict = Counter(win_pos)
     count_max = max(win_pos_dict.values())
     win_pos_best = [k for k in win_pos_dict if win_pos_dict[k] == count_max]
     return win_pos_best
 
 
 def get_input_from_bot(users_hist, available_pos, win_lines,
-                       board_size, bot_level):
+                       board_size, bot_level, rng=random, board=None):
     """ Get a proper position from bot
         (thinking only (N-1)-Steps ahead at most)
     Input:
         user_hist: list, position history for a given user
         available_pos: list, available positions on play board
-        win_lines: list of sets, collection of winning conditions
+        win_lines: list of sets or WinWindows, winning conditions, only
+            read without <board> (callers with one pass board.line_sets)
         board_size: int, grid size n of a play board nxn
         bot_level: float, smart level of bot
+        rng: random.Random, random generator, the shared one by default
+        board: BoardState, state of the same game if there is, to read
+            winning positions from its line buckets instead of <win_lines>
     Output:
         pos_chosen: int, position chosen for the bot
     """
     ## set users_hist_ordered[0] always bot
     if len(users_hist[0]) > len(users_hist[1]):   ## i.e. bot_role = 2
         users_hist_ordered = users_hist[::-1]
+        bot_player_id = 1
     else:
         users_hist_ordered = users_hist
+        bot_player_id = 0
     ## find most frequent win_pos for Bot/User, then Bot chooses one if exists
     bot_prob = bot_level ** 1.5 + 1e-6      ## twist for better user experience
-    for i in range(1, board_size):
-        if random.random() < bot_prob:
-            win_pos_i = find_win_pos_best(users_hist_ordered[0], available_pos,
-                                          win_lines, i)
-            if len(win_pos_i) > 0:
-                return random.choice(win_pos_i)
-        if random.random() < bot_prob:
-            win_pos_i = find_win_pos_best(users_hist_ordered[1], available_pos,
-                                          win_lines, i)
-            if len(win_pos_i) > 0:
-                return random.choice(win_pos_i)
+    ## think as many steps ahead as the winning lines are long
+    if board is not None:
+        win_len = board.win_len
+    elif len(win_lines) > 0:
+        win_len = len(win_lines[0])
+    else:
+        win_len = board_size
+    for i in range(1, win_len):
+        for k in range(2):                  ## bot first, then the user
+            if rng.random() < bot_prob:
+                if board is None:
+                    win_pos_i = find_win_pos_best(users_hist_ordered[k],
+                                                  available_pos, win_lines, i)
+                else:
+                    win_pos_i = board.win_pos_best(bot_player_id ^ k, i)
+                if len(win_pos_i) > 0:
+                    if tictactoe_profile.active is not None:
+                        tictactoe_profile.active.add_depth(i)
+                    return rng.choice(win_pos_i)
+    if tictactoe_profile.active is not None:
+        tictactoe_profile.active.add_depth(0)
     ## find nothing, then pick up any available position
-    pos_chosen = random.choice(available_pos)
+    pos_chosen = rng.choice(available_pos)
     return pos_chosen
 
 
-def bot_vs_bot_stats(board_size, bot1_level, bot2_level, n_games=10000):
+def bot_player(bot_level, rng=random, bot_input=get_input_from_bot):
+    """ Bot as a player function of play_game()
+    Input:
+        bot_level: float, smart level of bot
+        rng: random.Random, random generator, the shared one by default
+        bot_input: function, bot strategy with inputs as get_input_from_bot()
+    Output:
+        player: function, taking a BoardState and returning a position
+    """
+    def player(board):
+        return bot_input(board.users_hist, board.available_pos,
+                         board.line_sets, board.board_size, bot_level, rng,
+                         board=board)
+    return player
+
+
+def bot_vs_bot_stats(board_size, bot1_level, bot2_level, n_games=10000,
+                     workers=1, seed=None, batch=False, win_len=None,
+                     ci_width=None, chunk=500, record=None, bot_inputs=None):
     """ Statistics of bot against bot games for user experience improvement
     Input:
         board_size: int, grid size n of a play board nxn
         bot1_level: float, smart level for bot-1, range: [0,1]
         bot2_level: float, smart level for bot-2, range: [0,1]
-        n_games: int, number of games to test for statistics
+        n_games: int, number of games to test for statistics (at most, if
+            <ci_width> is given)
+        workers: int, number of processes sharing the games, 1 for no pool
+        seed: int, seed for reproducible statistics, or None to use the
+            shared random generator (when workers=1)
+        batch: bool, play games in lockstep with the NumPy batch simulator
+        win_len: int, k positions in a row to win, <board_size> if None
+        ci_width: float, if given, play games in chunks and stop once the
+            95% confidence intervals of all rates are at most this wide
+        chunk: int, number of games per chunk when <ci_width> is given
+        record: str, file to append the played games to (see
+            tictactoe_records), with suffix '.<i>' for the i-th worker
+        bot_inputs: tuple, strategies of bot-1 and bot-2 with inputs as
+            get_input_from_bot(), get_input_from_bot() for both if None
+        The games are measured in the active Profile of tictactoe_profile,
+        if any, including those played by the worker processes.
     Output:
         bot1_win_rate: float, percentage of bot-1 wins
         bot2_win_rate: float, percentage of bot-2 wins
         draw_rate: float, percentage of no one wins
+        ci: dict, only if <ci_width> is given: number of games played
+            ('n_games') and (low, high) intervals of the three rates
     """
     if board_size < 3:
         raise ValueError('bot_vs_bot_stats(): input <board_size> less than 3!')
@@ -94,34 +154,195 @@ def bot_vs_bot_stats(board_size, bot1_level, bot2_level, n_games=10000):
         raise ValueError('bot_vs_bot_stats(): input <bot1_level> not in [0,1]')
     if bot2_level < 0 or bot2_level > 1:
         raise ValueError('bot_vs_bot_stats(): input <bot2_level> not in [0,1]')
+    if batch and bot_inputs is not None:
+        raise ValueError('bot_vs_bot_stats(): <bot_inputs> not supported '
+                         + 'by the batch simulator')
+    if record is not None and not (seed is None or isinstance(seed, int)):
+        raise ValueError('bot_vs_bot_stats(): <seed> not int, as stored '
+                         + 'in the <record> file')
 
-    bot1_win_rate = 0
-    bot2_win_rate = 0
-    draw_rate = 0
-    for i in range(int(n_games)):
-        users_record, win_line = init_game(board_size)
-        available_pos_label = list(range(1, board_size**2+1))
-        win_status = 0
-        while win_status == 0:
-            if len(users_record[0]) == len(users_record[1]):
-                p = get_input_from_bot(users_record, available_pos_label,
-                                       win_line, board_size, bot1_level)
-                users_record[0].append(p)
+    n_games = int(n_games)
+    chunk = n_games if ci_width is None else max(1, int(chunk))
+    n_chunks = -(-n_games // chunk)
+    if seed is None and workers <= 1:
+        seeds = [None] * n_chunks
+    elif n_chunks == 1:
+        seeds = [seed]
+    else:
+        seeds = shard_seeds(seed, n_chunks)
+    pool = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(workers)
+    prof = tictactoe_profile.active
+    counts = [0, 0, 0]
+    n_played = 0
+    try:
+        for k in range(n_chunks):
+            n_chunk = min(chunk, n_games - n_played)
+            if pool is None:
+                results = [bot_vs_bot_counts(board_size, bot1_level,
+                                             bot2_level, n_chunk, seeds[k],
+                                             batch, win_len, record,
+                                             bot_inputs)]
             else:
-                p = get_input_from_bot(users_record, available_pos_label,
-                                       win_line, board_size, bot2_level)
-                users_record[1].append(p)
-            win_status = check_win_status(win_line, users_record)
+                ## one shard of games per worker, each with its own seed
+                shards = [n_chunk // workers + (i < n_chunk % workers)
+                          for i in range(workers)]
+                results = pool.map(bot_vs_bot_counts, [board_size] * workers,
+                                   [bot1_level] * workers,
+                                   [bot2_level] * workers, shards,
+                                   shard_seeds(seeds[k], workers),
+                                   [batch] * workers, [win_len] * workers,
+                                   [None if record is None else f'{record}.{i}'
+                                    for i in range(workers)],
+                                   [bot_inputs] * workers,
+                                   [prof is not None] * workers)
+            for c in results:
+                if pool is not None and prof is not None:
+                    c, worker_prof = c
+                    prof.merge(worker_prof)
+                counts = [a + b for a, b in zip(counts, c)]
+            n_played += n_chunk
+            if ci_width is not None:
+                intervals = [wilson_interval(c, n_played) for c in counts]
+                if max(hi - lo for lo, hi in intervals) <= ci_width:
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    bot1_win_rate = round(counts[0]/n_played, 3)
+    bot2_win_rate = round(counts[1]/n_played, 3)
+    draw_rate = round(counts[2]/n_played, 3)
+    if ci_width is None:
+        return bot1_win_rate, bot2_win_rate, draw_rate
+    ci = {'n_games': n_played}
+    for name, (lo, hi) in zip(['bot1_win_rate', 'bot2_win_rate', 'draw_rate'],
+                              intervals):
+        ci[name] = (round(lo, 4), round(hi, 4))
+    return bot1_win_rate, bot2_win_rate, draw_rate, ci
+
+
+def wilson_interval(k, n, z=1.96):
+    """ Wilson score interval of a rate k/n (95% confidence by default)
+    Output:
+        (low, high): float, bounds of the interval
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = k / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * (p * (1 - p) / n + z * z / (4 * n * n)) ** 0.5 / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def bot_vs_bot_counts(board_size, bot1_level, bot2_level, n_games, seed=None,
+                      batch=False, win_len=None, record=None,
+                      bot_inputs=None, profile=False):
+    """ Play bot against bot games in this process (see bot_vs_bot_stats())
+    Input:
+        profile: bool, measure the games in a new Profile, returned with
+            the counts (for worker processes)
+    Output:
+        counts: list, numbers of bot-1 wins, bot-2 wins and draws
+        prof: Profile, only if <profile> is True
+    """
+    if profile:
+        with tictactoe_profile.Profile() as prof:
+            counts = bot_vs_bot_counts(board_size, bot1_level, bot2_level,
+                                       n_games, seed, batch, win_len, record,
+                                       bot_inputs)
+        return counts, prof
+    prof = tictactoe_profile.active
+    if prof is not None:
+        prof.board_size = board_size
+    if batch:
+        from tictactoe_batch import batch_bot_vs_bot_counts
+        t0 = perf_counter()
+        counts = batch_bot_vs_bot_counts(board_size, bot1_level, bot2_level,
+                                         n_games, seed, win_len=win_len,
+                                         record=record)
+        if prof is not None:
+            ## games in lockstep: no per-move measures
+            prof.add_time('batch', perf_counter() - t0)
+            prof.count('games', n_games)
+        return counts
+    rng = random if seed is None else random.Random(seed)
+    counts = [0, 0, 0]
+    if bot_inputs is None:
+        bot_inputs = (get_input_from_bot, get_input_from_bot)
+    bots = [bot_player(bot1_level, rng, bot_inputs[0]),
+            bot_player(bot2_level, rng, bot_inputs[1])]
+    board = BoardState(board_size, init_game(board_size, None, win_len)[1])
+    writer = None
+    if record is not None:
+        from tictactoe_records import GameRecordWriter
+        writer = GameRecordWriter(record)
+        levels = (bot1_level, bot2_level)
+    for i in range(n_games):
+        if prof is None:
+            win_status = play_game(board.reset(), bots)
+        else:
+            win_status = prof.play_game(board.reset(), bots)
+        if writer is not None:
+            writer.write(board_size, board.win_len, levels, seed or 0,
+                         board.moves, win_status)
         if win_status == 1:
-            bot1_win_rate += 1
+            counts[0] += 1
         elif win_status == 2:
-            bot2_win_rate += 1
+            counts[1] += 1
         else:
-            draw_rate += 1
-    bot1_win_rate = round(bot1_win_rate/n_games, 3)
-    bot2_win_rate = round(bot2_win_rate/n_games, 3)
-    draw_rate = round(draw_rate/n_games, 3)
-    return bot1_win_rate, bot2_win_rate, draw_rate
+            counts[2] += 1
+    if writer is not None:
+        writer.close()
+    return counts
+
+
+def shard_seeds(seed, n_shards):
+    """ Independent seeds of random generators for shards of a job
+    Input:
+        seed: int, master seed, None for a random one
+        n_shards: int, number of seeds
+    Output:
+        seeds: list, reproducible for the same <seed> and <n_shards>
+    """
+    master = random.Random(seed)
+    return [master.getrandbits(64) for _ in range(n_shards)]
+
+
+def bot_vs_bot_tables(board_size, levels, n_games=10000, workers=1,
+                      seed=None, batch=False, ci_width=None, bot_inputs=None):
+    """ Win rates of bots for every pair of smart levels
+    Input:
+        board_size: int, grid size n of a play board nxn
+        levels: list, smart levels of bots, range: [0,1]
+        n_games: int, number of games for each pair of levels
+        workers: int, number of processes sharing the level pairs
+        seed: int, seed for reproducible tables, or None
+        batch: bool, play games with the NumPy batch simulator
+        ci_width: float, stop each pair early at this confidence interval
+            width, see bot_vs_bot_stats()
+        bot_inputs: tuple, strategies of bot-1 and bot-2, see
+            bot_vs_bot_stats()
+    Output:
+        rates: dict, (bot1_level, bot2_level) -> output of bot_vs_bot_stats()
+    """
+    pairs = [(l1, l2) for l1 in levels for l2 in levels]
+    n = len(pairs)
+    if seed is None and workers <= 1:
+        seeds = [None] * n
+    else:
+        seeds = shard_seeds(seed, n)
+    args = ([board_size] * n, [p[0] for p in pairs], [p[1] for p in pairs],
+            [n_games] * n, [1] * n, seeds, [batch] * n, [None] * n,
+            [ci_width] * n, [500] * n, [None] * n, [bot_inputs] * n)
+    if workers <= 1:
+        results = list(map(bot_vs_bot_stats, *args))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(bot_vs_bot_stats, *args))
+    return dict(zip(pairs, results))
 
 
 def main_play_with_bot():
@@ -133,13 +354,29 @@ def main_play_with_bot():
 
     ## smart level of the bot
     bot_level = 0.5                ## by default
+    bot_input = get_input_from_bot
     print('How smart the bot you want to play with? [0.0-1.0]')
     print('   0.0: random beginner; 1.0: full-power bot')
+    print("   'p': perfect-play bot (searching for the best move)")
+    print("   'l': learned bot (trained on bot-vs-bot games)")
+    print("   'm': Monte Carlo tree search bot (thinking for 1 second)")
     p = input('  > please input smart level [0.5]:')
-    while len(p) > 0 and (not isinstance(p, (float, int))
-                          or (p < 0 or p > 1)):
+    while len(p) > 0 and p.lower() not in ('p', 'l', 'm') \
+            and not (p.replace('.', '', 1).isdecimal() and float(p) <= 1):
         p = input('  > not a float number in [0,1]. try again [0.5]: ')
-    if len(p) > 0:
+    if p.lower() == 'p':
+        from tictactoe_solver import get_input_from_solver
+        bot_input = get_input_from_solver
+    elif p.lower() == 'l':
+        from tictactoe_learned import get_input_from_learned
+        bot_input = get_input_from_learned
+        bot_level = 1.0
+    elif p.lower() == 'm':
+        from functools import partial
+        from tictactoe_mcts import get_input_from_mcts
+        bot_input = partial(get_input_from_mcts, workers=os.cpu_count(),
+                            verbose=True)
+    elif len(p) > 0:
         bot_level = float(p)
 
     ## who plays first
@@ -151,57 +388,56 @@ def main_play_with_bot():
     ## initialize a game
     board_size_n = 3               ## by default
     p = input('Please input grid size of the play board [3]: ')
-    while len(p) > 0 and (not p.isdigit() or int(p) < 3):
+    while len(p) > 0 and (not p.isdecimal() or int(p) < 3):
         p = input('  > not a number or too small (<3). try again [3]: ')
     if len(p) > 0:
         board_size_n = int(p)
-    users_history = hist_input(board_size_n)
+    win_len = win_len_input(board_size_n)
+    users_history = hist_input(board_size_n, win_len)
 #    users_history = [[2, 7], [5, 4]]    ## test example
-    users_record, win_line = init_game(board_size_n, users_history)
+    board = new_game(board_size_n, users_history, win_len)
 
     try_again = 1
     while try_again > 0:
         if try_again > 1:
-            users_record, win_line = init_game(board_size_n)
+            board.reset()
+        users_record = board.users_hist
 
-        display(board_size_n, users_record)
-        available_pos_label = list(set(range(1, board_size_n**2+1))
-                                   - set(users_record[0])
-                                   - set(users_record[1]))
-        win_status = 0
+        prof = tictactoe_profile.active
+        if prof is not None:
+            prof.board_size = board_size_n
+        renderer = BoardRenderer(board_size_n)
+        renderer.draw(users_record)
+        win_status = board.status
         while win_status == 0:
             bot_turn = 0
-            if len(users_record[0]) == len(users_record[1]):
-                if bot_role == 1:
-                    sleep(0.5)
-                    p = get_input_from_bot(users_record, available_pos_label,
-                                           win_line, board_size_n, bot_level)
-                    print('Player1-Bot (X): ' + str(p))
-                    bot_turn = 1
-                else:
-                    print('Player1-User (X):')
-                    p = get_input(board_size_n, users_record,
-                                  available_pos_label)
-                users_record[0].append(p)
-            elif len(users_record[0]) == 1 + len(users_record[1]):
-                if bot_role == 1:
-                    print('Player2-User (O):')
-                    p = get_input(board_size_n, users_record,
-                                  available_pos_label)
-                else:
-                    sleep(0.5)
-                    p = get_input_from_bot(users_record, available_pos_label,
-                                           win_line, board_size_n, bot_level)
-                    print('Player2-Bot (O): ' + str(p))
-                    bot_turn = 1
-                users_record[1].append(p)
+            player = len(board.moves) & 1       ## 0: player-1, 1: player-2
+            if player + 1 == bot_role:
+                ## thinking time counts towards the pace of 0.5 seconds
+                t_start = perf_counter()
+                p = bot_input(users_record, board.available_pos,
+                              board.line_sets, board_size_n, bot_level,
+                              board=board)
+                if prof is not None:
+                    prof.add_time('bot', perf_counter() - t_start)
+                sleep(max(0.0, 0.5 - (perf_counter() - t_start)))
+                print('Player{}-Bot ({}): {}'.format(player + 1, 'XO'[player],
+                                                     p))
+                bot_turn = 1
+            else:
+                print('Player{}-User ({}):'.format(player + 1, 'XO'[player]))
+                p = get_input(board_size_n, users_record, board.available_pos,
+                              renderer, win_len)
+            if prof is None:
+                win_status = board.make(p)
             else:
-                raise ValueError('main(): <users_record> lengths go wrong :(')
-            available_pos_label.remove(p)
-            if bot_turn == 1:
-                display(board_size_n, users_record)
-            win_status = check_win_status(win_line, users_record)
-        display(board_size_n, users_record)
+                win_status = prof.make(board, p)
+            ## a printed board is shown after the bot's moves only
+            if bot_turn == 1 or renderer.ansi:
+                renderer.update(users_record)
+        show_win_status(win_status)
+        renderer.update(users_record)
+        renderer.close()
         print('-----------------------------------------')
         p = input('Do you want to play again (a new game)? (y/n) [y]: ')
         if p.lower() == 'n' or p.lower() == 'no':
@@ -210,35 +446,38 @@ def main_play_with_bot():
             try_again += 1
 
 
-def main_bot_vs_bot():
+def main_bot_vs_bot(board_size_n=4, bot1_level=0.4, bot2_level=0.4,
+                    **kwargs):
     """ test example to check win rates
+        (<kwargs> as bot_vs_bot_stats(), eg. n_games, workers, win_len)
     """
-    import io
-    import sys
-    text_trap = io.StringIO()
-    sys.stdout = text_trap
-
-    board_size_n = 4
-    bot1_level = 0.4
-    bot2_level = 0.4
-    b1r, b2r, dr = bot_vs_bot_stats(board_size_n, bot1_level, bot2_level)
+    rates = bot_vs_bot_stats(board_size_n, bot1_level, bot2_level, **kwargs)
+    ci = rates[3] if len(rates) > 3 else None
 
-    sys.stdout = sys.__stdout__
     print('win rates of bot1 vs bot2 on {}x{} grid:'.format(
          board_size_n, board_size_n))
-    print('bot1 ({}): {:.3f}'.format(bot1_level, b1r))
-    print('bot2 ({}): {:.3f}'.format(bot2_level, b2r))
-    print('draw: {:.3f}'.format(dr))
+    for label, rate, name in (('bot1 ({})'.format(bot1_level), rates[0],
+                               'bot1_win_rate'),
+                              ('bot2 ({})'.format(bot2_level), rates[1],
+                               'bot2_win_rate'),
+                              ('draw', rates[2], 'draw_rate')):
+        if ci is None:
+            print('{}: {:.3f}'.format(label, rate))
+        else:
+            print('{}: {:.3f} [{:.3f}, {:.3f}]'.format(label, rate,
+                                                       *ci[name]))
+    if ci is not None:
+        print('games: {} (95% intervals)'.format(ci['n_games']))
 
 
-def main_bot_vs_bot_tables():
+def main_bot_vs_bot_tables(board_size_n=3, levels=None, **kwargs):
     """ test example to get tables of win rates for bots at different levels
+        (<kwargs> as bot_vs_bot_tables(), eg. n_games, workers, ci_width)
     """
-    import io
-    import sys
-
-    board_size_n = 3
-    levels = [i/10 for i in range(11)]
+    if levels is None:
+        levels = [i/10 for i in range(11)]
+    kwargs.setdefault('workers', os.cpu_count())
+    kwargs.setdefault('ci_width', 0.02)
     table_bot1_win = ['## table of bot-1 win rate on {}x{} grid'.format(
                  board_size_n, board_size_n)]
     table_bot2_win = ['## table of bot-2 win rate on {}x{} grid'.format(
@@ -250,14 +489,13 @@ def main_bot_vs_bot_tables():
     table_bot2_win.append(column_names)
     table_draw.append(column_names)
 
-    text_trap = io.StringIO()
-    sys.stdout = text_trap
+    rates = bot_vs_bot_tables(board_size_n, levels, **kwargs)
     for l1 in levels:
         w1r = [str(l1)]
         w2r = [str(l1)]
         wdr = [str(l1)]
         for l2 in levels:
-            b1r, b2r, dr = bot_vs_bot_stats(board_size_n, l1, l2)
+            b1r, b2r, dr = rates[(l1, l2)][:3]
             w1r.append('{:.3f}'.format(b1r))
             w2r.append('{:.3f}'.format(b2r))
             wdr.append('{:.3f}'.format(dr))
@@ -265,7 +503,6 @@ def main_bot_vs_bot_tables():
         table_bot2_win.append(', '.join(w2r))
         table_draw.append(', '.join(wdr))
 
-    sys.stdout = sys.__stdout__
     print('## win rates for games among bots of different smart levels')
     print('')
     for s in table_bot1_win: